@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+What the upload encoding & sample rate cost on a slow uplink: sends the same speech-like segments through the google-pooled backend to a local stand-in of the Google API that lets request bodies through at `--bandwidth` bytes per second (shared by all connections, like one field-station uplink), once per combination of sample rate & encoding. Reports bytes per segment, wall time, latency percentiles & the time spent encoding, & checks the stand-in received what the backend counted as sent.
+"""
+from argparse import RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+import argparse, time
+import numpy as np
+from google_standin import start_standin
+from synth import load_elan_asr, speech_like
+
+
+
+
+def run(backend, segments, sample_rate, jobs):
+	latencies = []
+
+	def one(segment):
+		start = time.perf_counter()
+		backend.recognize([segment], "en-US", sample_rate)
+		latencies.append(time.perf_counter() - start)
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=jobs) as pool:
+		list(pool.map(one, segments))
+	return time.perf_counter() - start, np.percentile(latencies, [50, 95])
+
+
+
+
+def main(args):
+	backends = load_elan_asr("backends")
+	Metrics = load_elan_asr("metrics").Metrics
+	server = start_standin(latency=args.latency, handshake=0, bandwidth=args.bandwidth)
+	print(f"{args.requests} segments of {args.duration:.1f} s, -j {args.jobs}, uplink {args.bandwidth / 1024:.0f} kB/s, stand-in latency {args.latency * 1000:.0f} ms")
+	print(f"\n{'rate':>6} {'encoding':>8} {'kB/segment':>11} {'wall s':>8} {'p50 ms':>8} {'p95 ms':>8} {'encode s':>9}")
+	for sample_rate in args.rates:
+		segments = [speech_like(args.duration, sample_rate, seed) for seed in range(args.requests)]
+		for encoding in args.encodings:
+			metrics = Metrics()
+			backend = backends.GooglePooledBackend(url=server.url, pool_size=args.jobs, encoding=encoding, metrics=metrics)
+			server.bytes_received = 0
+			wall, (p50, p95) = run(backend, segments, sample_rate, args.jobs)
+			if server.bytes_received != backend.sent_bytes:
+				raise SystemExit(f"the stand-in received {server.bytes_received} bytes, the backend counted {backend.sent_bytes}")
+			encode = metrics.report(None)["stages"]["encode"]["total_seconds"]
+			print(f"{sample_rate:>6} {encoding:>8} {backend.sent_bytes / backend.sent_segments / 1024:11.1f} {wall:8.2f} {p50 * 1000:8.0f} {p95 * 1000:8.0f} {encode:9.3f}")
+	server.shutdown()
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--requests", type=int, default=40, help="Number of segments per combination.")
+	parser.add_argument("-j", "--jobs", type=int, default=4, help="Requests in flight at once.")
+	parser.add_argument("--duration", type=float, default=3.0, help="Seconds of audio per segment.")
+	parser.add_argument("--bandwidth", type=float, default=256 * 1024, help="Uplink in bytes per second, shared by all requests.")
+	parser.add_argument("--latency", type=float, default=0.05, help="Seconds the stand-in takes to answer once a body has arrived.")
+	parser.add_argument("--rates", type=int, nargs="+", default=[48000, 16000], help="Sample rates to compare (48000: what video often carries).")
+	parser.add_argument("--encodings", nargs="+", choices=("l16", "flac"), default=["l16", "flac"], help="Encodings to compare.")
+	main(parser.parse_args())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare the google backend (SpeechRecognition's recognize_google: a new connection per request) with google-pooled (one keep-alive requests.Session) against a local stand-in of the API, so the cost of connection setup shows up without network access. Sends the same short segments through each backend the way elan-asr.py does with --jobs, & reports wall time, latency percentiles & how many connections the stand-in saw.
+"""
+from argparse import RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import argparse, time, urllib.request
+import numpy as np
+from google_standin import start_standin
+from synth import load_elan_asr
+
+
+
+
+def redirect_urlopen(sr, url):
+	# recognize_google always posts to www.google.com; send its requests to the stand-in instead, otherwise unchanged
+	standin = urlsplit(url)
+
+	def urlopen(request, timeout=None):
+		request.full_url = urlsplit(request.full_url)._replace(scheme=standin.scheme, netloc=standin.netloc, path=standin.path).geturl()
+		return urllib.request.urlopen(request, timeout=timeout)
+	sr.urlopen = urlopen
+
+
+
+
+def run(backend, segments, jobs):
+	latencies = []
+
+	def one(segment):
+		start = time.perf_counter()
+		backend.recognize([segment], "en-US")
+		latencies.append(time.perf_counter() - start)
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=jobs) as pool:
+		list(pool.map(one, segments))
+	return time.perf_counter() - start, np.percentile(latencies, [50, 95, 99])
+
+
+
+
+def main(args):
+	elan_asr = load_elan_asr("backends")
+	server = start_standin(latency=args.latency, handshake=args.handshake)
+	redirect_urlopen(elan_asr.sr, server.url)
+	rng = np.random.default_rng(0)
+	segments = [(rng.standard_normal(int(args.duration * elan_asr.SAMPLE_RATE)) * 3000).astype(np.int16) for i in range(args.requests)]
+	print(f"{args.requests} requests of {args.duration:.1f} s audio, -j {args.jobs}, stand-in latency {args.latency * 1000:.0f} ms + {args.handshake * 1000:.0f} ms per new connection")
+	backends = {"google": elan_asr.GoogleBackend(), "google-pooled": elan_asr.GooglePooledBackend(url=server.url, pool_size=args.jobs)}
+	for name, backend in backends.items():
+		server.connections = 0
+		wall, (p50, p95, p99) = run(backend, segments, args.jobs)
+		print(f"{name:>14}: {wall:6.2f} s	{args.requests / wall:7.1f} requests/s	p50 {p50 * 1000:6.1f} ms	p95 {p95 * 1000:6.1f} ms	p99 {p99 * 1000:6.1f} ms	{server.connections} connections")
+	server.shutdown()
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--requests", type=int, default=200, help="Number of requests per backend.")
+	parser.add_argument("-j", "--jobs", type=int, default=4, help="Requests in flight at once.")
+	parser.add_argument("--duration", type=float, default=1.0, help="Seconds of audio per request.")
+	parser.add_argument("--latency", type=float, default=0.03, help="Seconds the stand-in takes to answer a request.")
+	parser.add_argument("--handshake", type=float, default=0.05, help="Seconds the stand-in adds for each new connection (TCP / TLS setup to a remote server).")
+	main(parser.parse_args())
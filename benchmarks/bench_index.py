@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Compare the AnnotationIndex (time slots & annotations as arrays, queries over whole tiers at once) with what it replaced: a dict of TIME_VALUE strings, a list of annotation tuples per tier & the conversions & queries done annotation by annotation in Python. Times building both from a parsed synthetic Elan file & three queries on them: total annotated time of a tier, the overlaps between two tiers & the annotations in a series of time windows.
+"""
+from argparse import RawTextHelpFormatter
+import argparse, tempfile, time
+import xml.etree.ElementTree as et
+from synth import load_elan_asr, write_eaf
+
+
+
+
+def build_dicts(elan, tier_ids):
+	ts_dict = {slot.get("TIME_SLOT_ID"): slot.get("TIME_VALUE") for slot in elan.find("TIME_ORDER")}
+	tiers = {}
+	for tier_id in tier_ids:
+		tier = elan.find(f"TIER[@TIER_ID='{tier_id}']")
+		tiers[tier_id] = [(alignable.get("ANNOTATION_ID"), int(ts_dict[alignable.get("TIME_SLOT_REF1")]), int(ts_dict[alignable.get("TIME_SLOT_REF2")])) for annotation in tier for alignable in annotation]
+	return tiers
+
+
+
+
+def dicts_total_speech(annotations):
+	total = 0
+	stretch_start = stretch_end = None
+	for annotation_id, start, end in sorted(annotations, key=lambda a: a[1]):
+		if stretch_end is None or start > stretch_end:
+			if stretch_end is not None:
+				total += stretch_end - stretch_start
+			stretch_start, stretch_end = start, end
+		else:
+			stretch_end = max(stretch_end, end)
+	return total + (stretch_end - stretch_start if stretch_end is not None else 0)
+
+
+
+
+def dicts_overlaps(a, b):
+	# sweep over both tiers sorted by start
+	b = sorted(b, key=lambda x: x[1])
+	pairs = []
+	first = 0
+	for a_id, a_start, a_end in sorted(a, key=lambda x: x[1]):
+		while first < len(b) and b[first][2] <= a_start:
+			first += 1
+		for i in range(first, len(b)):
+			b_id, b_start, b_end = b[i]
+			if b_start >= a_end:
+				break
+			overlap = min(a_end, b_end) - max(a_start, b_start)
+			if overlap > 0:
+				pairs.append((a_id, b_id, overlap))
+	return pairs
+
+
+
+
+def dicts_window(annotations, start, end):
+	return [annotation_id for annotation_id, a_start, a_end in annotations if a_start < end and a_end > start]
+
+
+
+
+def timed(f, *args, repeat=3):
+	# best of `repeat` runs
+	best = None
+	for i in range(repeat):
+		start = time.perf_counter()
+		result = f(*args)
+		t = time.perf_counter() - start
+		best = t if best is None else min(best, t)
+	return best, result
+
+
+
+
+def main(args):
+	elan_asr = load_elan_asr("eaf")
+	AnnotationIndex = load_elan_asr("index").AnnotationIndex
+	with tempfile.TemporaryDirectory(prefix="elan-asr-bench-") as work_dir:
+		eaf = write_eaf(f"{work_dir}/index.eaf", f"{work_dir}/media.wav", args.tiers, args.annotations)
+		elan = et.parse(eaf).getroot()
+	tier_ids = [f"tier{t + 1}" for t in range(args.tiers)]
+	span = args.annotations * 1000
+	windows = [(i * span // args.windows, i * span // args.windows + 60000) for i in range(args.windows)]
+	print(f"{args.annotations} annotations x {args.tiers} tiers, {args.windows} one-minute windows")
+
+	def index_build():
+		index = AnnotationIndex()
+		elan_asr.index_time_slots(elan, index)
+		for tier_id in tier_ids:
+			elan_asr.index_tier(elan.find(f"TIER[@TIER_ID='{tier_id}']"), index)
+		return index.finish()
+
+	t, tiers = timed(build_dicts, elan, tier_ids)
+	results = {"build": [t]}
+	t, index = timed(index_build)
+	results["build"].append(t)
+	for name, dicts_query, index_query in [
+		("total speech", lambda: [dicts_total_speech(tiers[tier_id]) for tier_id in tier_ids], lambda: [index.total_speech(tier_id) for tier_id in tier_ids]),
+		("overlaps", lambda: len(dicts_overlaps(tiers["tier1"], tiers["tier2"])), lambda: len(index.overlaps("tier1", "tier2")[0])),
+		("windows", lambda: sum(len(dicts_window(tiers["tier1"], *w)) for w in windows), lambda: sum(len(index.window("tier1", *w)) for w in windows)),
+	]:
+		t_dicts, expected = timed(dicts_query)
+		t_index, got = timed(index_query)
+		if got != expected:
+			raise SystemExit(f"{name}: index gave {got}, dicts {expected}")
+		results[name] = [t_dicts, t_index]
+	print(f"\n{'':>14} {'dicts ms':>10} {'index ms':>10} {'speed-up':>9}")
+	for name, (t_dicts, t_index) in results.items():
+		print(f"{name:>14} {t_dicts * 1000:10.2f} {t_index * 1000:10.2f} {t_dicts / t_index:8.1f}x")
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--annotations", type=int, default=50000, help="Annotations per tier.")
+	parser.add_argument("-T", "--tiers", type=int, default=2, help="Number of tiers (at least 2, for the overlaps).")
+	parser.add_argument("-w", "--windows", type=int, default=1000, help="Number of time window queries.")
+	main(parser.parse_args())
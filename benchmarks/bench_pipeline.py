@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Run the whole elan-asr.py pipeline (decode, slice, silence check, recognize, write back) on a synthetic Elan file & matching media, with the stub backend standing in for the ASR engine at a configurable latency. Reports wall time, annotations/sec, peak resident memory & the time spent in each stage, and saves everything as JSON so runs can be compared over time.
+
+Arguments after `--` are passed on to elan-asr.py, e.g. `python benchmarks/bench_pipeline.py -n 2000 -- --stream -j 8`.
+"""
+from argparse import RawTextHelpFormatter
+import argparse, datetime, json, os, platform, shutil, subprocess, sys, tempfile, time
+from synth import REPO, write_eaf, write_wav
+
+
+
+
+def git_revision():
+	try:
+		return subprocess.run(["git", "-C", REPO, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+
+
+def run_once(source, work_dir, args, extra):
+	# each run on a fresh copy, in its own process: os.wait4 gives that process' own peak RSS (in KB on Linux)
+	eaf = shutil.copy(source, f"{work_dir}/run.eaf")
+	metrics_path = f"{work_dir}/metrics.json"
+	cmd = [sys.executable, os.path.join(REPO, "elan-asr.py"), "-e", eaf, "-t", "tier1", "-l", "en", "-b", "stub",
+		"--stub-latency", str(args.latency), "-j", str(args.jobs), "--no-cache", "--metrics-out", metrics_path] + ([] if args.media_cache else ["--no-media-cache"]) + extra
+	env = dict(os.environ, XDG_CACHE_HOME=work_dir)
+	start = time.perf_counter()
+	proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+	stderr = proc.stderr.read()
+	pid, status, rusage = os.wait4(proc.pid, 0)
+	wall = time.perf_counter() - start
+	if status:
+		sys.exit(f"elan-asr.py failed:\n{stderr.decode(errors='replace')}")
+	with open(metrics_path, encoding="utf-8") as inj:
+		report = json.load(inj)["files"][0]
+	return {
+		"wall_seconds": wall,
+		"annotations_per_second": args.annotations / wall,
+		"peak_rss_mb": rusage.ru_maxrss / 1024,
+		"stages": report["stages"],
+		"counters": report["counters"],
+	}
+
+
+
+
+def main(args, extra):
+	work_dir = tempfile.mkdtemp(prefix="elan-asr-bench-")
+	try:
+		media = write_wav(f"{work_dir}/media.wav", args.annotations, args.duration, args.gap)
+		source = write_eaf(f"{work_dir}/source.eaf", media, args.tiers, args.annotations, args.duration, args.gap)
+		print(f"{args.annotations} annotations x {args.tiers} tiers, {args.annotations * (args.duration + args.gap) / 60000:.1f} min of media, stub latency {args.latency * 1000:.0f} ms, -j {args.jobs} {' '.join(extra)}")
+		runs = []
+		for i in range(args.repeat):
+			run = run_once(source, work_dir, args, extra)
+			runs.append(run)
+			print(f"run {i + 1}: {run['wall_seconds']:7.2f} s	{run['annotations_per_second']:8.1f} annotations/s	peak RSS {run['peak_rss_mb']:7.1f} MB")
+		best = min(runs, key=lambda run: run["wall_seconds"])
+		print(f"\nstages of the fastest run:\n{'stage':>14} {'calls':>7} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+		for stage, t in sorted(best["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+			print(f"{stage:>14} {t['calls']:7d} {t['total_seconds']:9.3f} {t['p50'] * 1000:9.2f} {t['p95'] * 1000:9.2f} {t['p99'] * 1000:9.2f}")
+	finally:
+		shutil.rmtree(work_dir)
+
+	results = {
+		"date": datetime.datetime.now().isoformat(timespec="seconds"),
+		"revision": git_revision(),
+		"python": platform.python_version(),
+		"machine": platform.machine(),
+		"parameters": {"annotations": args.annotations, "tiers": args.tiers, "duration": args.duration, "gap": args.gap,
+			"latency": args.latency, "jobs": args.jobs, "media_cache": args.media_cache, "extra_args": extra},
+		"runs": runs,
+	}
+	output = args.output or f"bench_pipeline-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+	with open(output, 'w', encoding="utf-8") as outj:
+		json.dump(results, outj, indent=4)
+	print(f"\nResults written to {output}")
+
+
+
+
+if __name__ == '__main__':
+	argv = sys.argv[1:]
+	extra = argv[argv.index("--") + 1:] if "--" in argv else []
+	argv = argv[:argv.index("--")] if "--" in argv else argv
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--annotations", type=int, default=1000, help="Annotations per tier.")
+	parser.add_argument("-T", "--tiers", type=int, default=2, help="Number of tiers; the first one is recognized, the others are written back untouched.")
+	parser.add_argument("--duration", type=int, default=700, help="Length of each annotation in ms.")
+	parser.add_argument("--gap", type=int, default=300, help="Silence between annotations in ms.")
+	parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake recognizer takes per request.")
+	parser.add_argument("-j", "--jobs", type=int, default=4, help="Passed on as elan-asr.py --jobs.")
+	parser.add_argument("--media-cache", action="store_true", help="Leave elan-asr.py's media cache on, so every run after the first maps the decoded media instead of decoding it (default: decode in every run).")
+	parser.add_argument("-r", "--repeat", type=int, default=3, help="Number of runs.")
+	parser.add_argument("-o", "--output", type=str, default=None, help="JSON file to save the results to (default: bench_pipeline-<date>.json).")
+	main(parser.parse_args(argv), extra)
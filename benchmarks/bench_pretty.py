@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Check that pretty() still serializes Elan files byte for byte like the original nested-loop version did, then time it as the tier grows, to show it scales linearly with the number of annotations.
+"""
+from argparse import RawTextHelpFormatter
+import argparse, io, shutil, tempfile, time
+import xml.etree.ElementTree as et
+from synth import load_elan_asr, write_eaf
+
+
+
+
+def pretty_reference(eaf_doc):
+	# pretty() as it was before it was made linear: re-indents every annotation of the tier once per annotation
+	eaf_doc.text = "\n    "
+	header = eaf_doc.find("HEADER")
+	header.text = "\n        "
+	for i, sh in enumerate(header, start=1):
+		if i != len(header):
+			sh.tail = "\n        "
+		else:
+			sh.tail = "\n    "
+	header.tail = "\n    "
+	time_order = eaf_doc.find("TIME_ORDER")
+	time_order.text = "\n        "
+	nr_of_slots = len(time_order)
+	for slot_idx, slot in enumerate(time_order, start=1):
+		if slot_idx != nr_of_slots:
+			slot.tail = "\n        "
+		else:
+			slot.tail = "\n    "
+	time_order.tail = "\n    "
+	tiers = eaf_doc.findall("TIER")
+	for tier_idx, tier in enumerate(tiers, start=1):
+		tier.tail = "\n    "
+		tier.text = "\n        "
+		for annotation_idx, annotation in enumerate(tier, start=1):
+			nr_of_annotations = len(tier)
+			if annotation_idx != nr_of_annotations:
+				annotation.tail = "\n        "
+			else:
+				annotation.tail = "\n    "
+			for alignable in tier:
+				alignable.text = "\n            "
+				for val in alignable:
+					val.text = "\n                "
+					val.tail = "\n        "
+					for v in val:
+						v.tail = "\n            "
+	ling_types = eaf_doc.findall("LINGUISTIC_TYPE")
+	for ling_type in ling_types:
+		ling_type.tail = "\n    "
+	constraints = eaf_doc.findall("CONSTRAINT")
+	for ci, c in enumerate(constraints, start=1):
+		if ci != len(constraints):
+			c.tail = "\n    "
+		else:
+			c.tail = "\n"
+	return eaf_doc
+
+
+
+
+def serialize(elan):
+	out = io.BytesIO()
+	et.ElementTree(elan).write(out, encoding="utf-8", xml_declaration=True)
+	return out.getvalue()
+
+
+
+
+def compact(elan):
+	# what the tree looks like when ELAN (or another tool) wrote the file without indentation
+	for elem in elan.iter():
+		if elem.tag != "ANNOTATION_VALUE":
+			elem.text = None
+		elem.tail = None
+	return elan
+
+
+
+
+def check_identical(elan_asr, work_dir):
+	shapes = {
+		"indented, 4 tiers": dict(tiers=4, annotations=50, text="some words"),
+		"single annotation": dict(tiers=1, annotations=1, text="x"),
+		"empty tiers": dict(tiers=3, annotations=0),
+		"empty values": dict(tiers=2, annotations=20),
+	}
+	for name, shape in shapes.items():
+		eaf = write_eaf(f"{work_dir}/check.eaf", f"{work_dir}/media.wav", **shape)
+		for variant, prepare in (("as written", lambda e: e), ("compact", compact)):
+			expected = serialize(pretty_reference(prepare(et.parse(eaf).getroot())))
+			got = serialize(elan_asr.pretty(prepare(et.parse(eaf).getroot())))
+			if got != expected:
+				raise SystemExit(f"pretty() output differs from the reference for '{name}' ({variant})")
+	print(f"pretty() output identical to the reference on {len(shapes) * 2} Elan file shapes")
+
+
+
+
+def time_pretty(pretty, eaf, repeat):
+	best = float("inf")
+	for _ in range(repeat):
+		elan = et.parse(eaf).getroot()
+		start = time.perf_counter()
+		pretty(elan)
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+
+
+def main(args):
+	elan_asr = load_elan_asr("eaf")
+	work_dir = tempfile.mkdtemp(prefix="elan-asr-bench-")
+	try:
+		check_identical(elan_asr, work_dir)
+		print(f"{'annotations':>12}	{'pretty()':>10}	{'per annotation':>14}	{'reference':>10}")
+		for n in args.sizes:
+			eaf = write_eaf(f"{work_dir}/bench.eaf", f"{work_dir}/media.wav", tiers=1, annotations=n)
+			wall = time_pretty(elan_asr.pretty, eaf, args.repeat)
+			reference = f"{time_pretty(pretty_reference, eaf, 1):9.3f}s" if n <= args.reference_limit else f"{'-':>10}"
+			print(f"{n:>12}	{wall:9.4f}s	{wall / n * 1e6:11.2f} µs	{reference}")
+	finally:
+		shutil.rmtree(work_dir)
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Tier sizes (number of annotations) to time.")
+	parser.add_argument("-r", "--repeat", type=int, default=3, help="Best of how many runs per size.")
+	parser.add_argument("--reference-limit", type=int, default=2000, help="Also time the quadratic reference up to this tier size.")
+	main(parser.parse_args())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Checks the request scheduling (ThrottledBackend) against a stub engine that fails like an overloaded API: `-n` requests from twice `--jobs` threads, with `--failure-rate` of the engine's answers an HTTP 429 / 503. Reports the time taken, the retries, the engine's peak concurrency & the smallest AIMD window seen, & fails (exit status 1) unless every request got an answer, some were retried, the engine never had more than --jobs requests at once & the window was halved. A second, single request checks that a Retry-After longer than the backoff is waited out.
+"""
+from argparse import RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+import argparse, sys, threading, time
+import numpy as np
+from synth import load_elan_asr
+
+
+
+
+def counting_stub(backends, latency, failure_rate):
+	# the stub engine, keeping track of how many requests it is working on at once
+	class CountingStub(backends.StubBackend):
+		def __init__(self):
+			super().__init__(latency=latency, failure_rate=failure_rate)
+			self.count_lock = threading.Lock()
+			self.active = 0
+			self.peak = 0
+
+		def recognize(self, segments, lang, sample_rate=16000):
+			with self.count_lock:
+				self.active += 1
+				self.peak = max(self.peak, self.active)
+			try:
+				return super().recognize(segments, lang, sample_rate)
+			finally:
+				with self.count_lock:
+					self.active -= 1
+
+	return CountingStub()
+
+
+
+
+def retry_after_stub(backends, sr, retry_after):
+	# fails the first request with a 429 asking for `retry_after` seconds, answers after that; remembers when it was called
+	class RetryAfterStub(backends.StubBackend):
+		def __init__(self):
+			super().__init__()
+			self.calls = []
+
+		def recognize(self, segments, lang, sample_rate=16000):
+			self.calls.append(time.monotonic())
+			if len(self.calls) == 1:
+				raise sr.RequestError("recognition request failed: stub failure") from HTTPError("stub://", 429, "stub failure", {"Retry-After": f"{retry_after}"}, None)
+			return super().recognize(segments, lang, sample_rate)
+
+	return RetryAfterStub()
+
+
+
+
+def main(args):
+	backends = load_elan_asr("backends")
+	sr = backends.sr
+	segment = (np.random.default_rng(0).standard_normal(16000) * 3000).astype(np.int16)
+	checks = []
+
+	stub = counting_stub(backends, args.latency, args.failure_rate)
+	backend = backends.ThrottledBackend(stub, threading.BoundedSemaphore(args.jobs), args.jobs, retries=args.retries, backoff=args.backoff, max_backoff=args.backoff * 8)
+	smallest = [backend.window]
+
+	def one(i):
+		responses = backend.recognize([segment], "en-US")
+		smallest[0] = min(smallest[0], backend.window)
+		return responses
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=2 * args.jobs) as pool:
+		futures = [pool.submit(one, i) for i in range(args.requests)]
+		answered = 0
+		for future in futures:
+			try:
+				answered += bool(future.result()[0])
+			except sr.RequestError:
+				pass
+	wall = time.perf_counter() - start
+	print(f"{args.requests} requests, -j {args.jobs}, {args.failure_rate:.0%} of answers failing: {wall:.2f} s, {backend.retried} retried, peak concurrency {stub.peak}, smallest window {smallest[0]:.1f}")
+	checks.append((answered == args.requests, f"every request answered ({answered} of {args.requests})"))
+	checks.append((backend.retried > 0, "failed requests were retried"))
+	checks.append((stub.peak <= args.jobs, f"at most {args.jobs} requests in flight (peak {stub.peak})"))
+	checks.append((smallest[0] <= args.jobs / 2, f"the window was halved on failures (smallest {smallest[0]:.1f})"))
+
+	retry_after = 20 * args.backoff
+	stub = retry_after_stub(backends, sr, retry_after)
+	backend = backends.ThrottledBackend(stub, threading.BoundedSemaphore(1), 1, retries=args.retries, backoff=args.backoff, max_backoff=args.backoff)
+	backend.recognize([segment], "en-US")
+	waited = stub.calls[1] - stub.calls[0]
+	checks.append((len(stub.calls) == 2 and waited >= retry_after, f"Retry-After of {retry_after:.2f} s waited out ({waited:.2f} s)"))
+
+	print()
+	for ok, check in checks:
+		print(f"{'ok' if ok else 'FAILED':>7}  {check}")
+	sys.exit(0 if all(ok for ok, check in checks) else 1)
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--requests", type=int, default=200, help="Number of requests.")
+	parser.add_argument("-j", "--jobs", type=int, default=8, help="Requests in flight at once (ThrottledBackend's jobs).")
+	parser.add_argument("--failure-rate", type=float, default=0.3, help="Fraction of the stub's answers that are HTTP 429 / 503.")
+	parser.add_argument("--latency", type=float, default=0.01, help="Seconds the stub takes per request.")
+	parser.add_argument("--retries", type=int, default=30, help="Retries per request.")
+	parser.add_argument("--backoff", type=float, default=0.01, help="Base backoff in seconds (kept short so the check runs quickly).")
+	main(parser.parse_args())
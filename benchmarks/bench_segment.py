@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+How fast & how well --segment finds the speech in a recording: synthesizes `--minutes` of speech-like utterances (random lengths, random pauses, over a low noise floor) with known boundaries, runs the segmenter over it & reports the time taken as a real-time factor (seconds of work per second of media, < 1 is faster than real time), the annotations it made & how they line up with the utterances (share of the speech covered, share of the annotated time that is speech). Fails (exit status 1) if segmenting is slower than real time.
+
+`--pipeline` also writes the media & an Elan file with an empty tier & runs elan-asr.py --segment on it with the stub backend, decoding & recognition included.
+"""
+from argparse import RawTextHelpFormatter
+import argparse, os, subprocess, sys, tempfile, time, wave
+import numpy as np
+from synth import REPO, load_elan_asr, speech_like, write_eaf
+
+
+
+
+def utterances(minutes, sample_rate, seed):
+	# (pcm, [(start ms, end ms)] of the utterances in it)
+	rng = np.random.default_rng(seed)
+	parts = []
+	truth = []
+	position = 0
+	i = 0
+	while position < minutes * 60 * sample_rate:
+		pause = int(rng.uniform(0.15, 3) * sample_rate)
+		parts.append((rng.standard_normal(pause) * 30).astype(np.int16))
+		position += pause
+		speech = speech_like(rng.uniform(0.3, 25), sample_rate, seed * 100000 + i)
+		parts.append(speech)
+		truth.append((position * 1000 // sample_rate, (position + len(speech)) * 1000 // sample_rate))
+		position += len(speech)
+		i += 1
+	parts.append((rng.standard_normal(sample_rate) * 30).astype(np.int16))
+	return np.concatenate(parts), truth
+
+
+
+
+def coverage(truth, segments, duration):
+	# (share of the utterances' ms inside annotations, share of the annotations' ms inside utterances)
+	def mask(spans):
+		marks = np.zeros(duration + 1, dtype=np.int32)
+		for start, end in spans:
+			marks[start] += 1
+			marks[end] -= 1
+		return np.cumsum(marks)[:duration] > 0
+	speech, annotated = mask(truth), mask(segments)
+	both = np.count_nonzero(speech & annotated)
+	return both / max(np.count_nonzero(speech), 1), both / max(np.count_nonzero(annotated), 1)
+
+
+
+
+def pipeline(pcm, sample_rate, work_dir, args):
+	media = f"{work_dir}/segment.wav"
+	with wave.open(media, 'wb') as outw:
+		outw.setnchannels(1)
+		outw.setsampwidth(2)
+		outw.setframerate(sample_rate)
+		outw.writeframes(pcm.tobytes())
+	eaf = write_eaf(f"{work_dir}/segment.eaf", media, tiers=1, annotations=0)
+	command = [sys.executable, os.path.join(REPO, "elan-asr.py"), "-e", eaf, "-b", "stub", "--segment", "--no-cache", "--no-media-cache", "--no-results", "-j", f"{args.jobs}",
+		"--min-segment", f"{args.min_segment}", "--max-segment", f"{args.max_segment}", "--min-pause", f"{args.min_pause}"]
+	start = time.perf_counter()
+	proc = subprocess.run(command, capture_output=True, text=True)
+	wall = time.perf_counter() - start
+	if proc.returncode != 0:
+		raise SystemExit(f"elan-asr.py failed:\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}")
+	return wall
+
+
+
+
+def main(args):
+	audio = load_elan_asr("audio")
+	start = time.perf_counter()
+	pcm, truth = utterances(args.minutes, args.sample_rate, args.seed)
+	duration = len(pcm) * 1000 // args.sample_rate
+	print(f"{duration / 60000:.1f} min of media, {len(truth)} utterances ({time.perf_counter() - start:.1f} s to synthesize)")
+	best = None
+	for i in range(args.repeat):
+		start = time.perf_counter()
+		segments = audio.speech_segments(pcm, args.silence_threshold, args.min_segment, args.max_segment, args.min_pause, sample_rate=args.sample_rate)
+		t = time.perf_counter() - start
+		best = t if best is None else min(best, t)
+	lengths = np.array([end - start for start, end in segments]) / 1000
+	recall, precision = coverage(truth, segments, duration)
+	print(f"\nsegmenting: {best:.2f} s, real-time factor {best / (duration / 1000):.5f} ({duration / 1000 / best:.0f}x faster than real time)")
+	print(f"annotations: {len(segments)}, {lengths.min():.2f}-{lengths.max():.2f} s (median {np.median(lengths):.2f} s)")
+	print(f"speech covered: {recall:.1%}, annotated time that is speech: {precision:.1%}")
+	if args.pipeline:
+		with tempfile.TemporaryDirectory(prefix="elan-asr-bench-") as work_dir:
+			wall = pipeline(pcm, args.sample_rate, work_dir, args)
+		print(f"\nelan-asr.py --segment -b stub: {wall:.1f} s, real-time factor {wall / (duration / 1000):.5f}")
+	sys.exit(1 if best > duration / 1000 else 0)
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("--minutes", type=float, default=60, help="Length of the synthetic media.")
+	parser.add_argument("--sample-rate", type=int, default=16000, help="Sample rate of the media.")
+	parser.add_argument("--silence-threshold", type=float, default=-50, help="As elan-asr.py's.")
+	parser.add_argument("--min-segment", type=float, default=0.5, help="As elan-asr.py's.")
+	parser.add_argument("--max-segment", type=float, default=15, help="As elan-asr.py's.")
+	parser.add_argument("--min-pause", type=float, default=0.3, help="As elan-asr.py's.")
+	parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs of the segmenter; the best is reported.")
+	parser.add_argument("--pipeline", action="store_true", help="Also run elan-asr.py --segment on the media end to end (needs ffmpeg).")
+	parser.add_argument("-j", "--jobs", type=int, default=8, help="--jobs for the --pipeline run.")
+	parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic media.")
+	main(parser.parse_args())
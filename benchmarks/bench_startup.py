@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the command line: runs elan-asr.py for commands that do no recognition (--help, -L, -L with filters, -M, & --submit, pointed at a socket no server listens on) under `python -X importtime`, reports wall time & the slowest imports, & fails (exit status 1) if any of them imports one of the heavy modules that only recognition needs, or if -L given a language code (de, ar, en) lists anything but that language. Run it after changing imports, e.g. as a check before committing.
+
+`--script` measures another copy of the script instead, e.g. an older revision (`git show REV:elan-asr.py > /tmp/old.py`) for a before / after comparison.
+"""
+from argparse import RawTextHelpFormatter
+import argparse, os, statistics, subprocess, sys, tempfile, time
+from synth import REPO, write_eaf
+
+
+HEAVY = ("numpy", "speech_recognition", "requests", "tqdm", "sqlite3")
+
+
+
+
+def import_times(stderr):
+	# {module: cumulative µs} from -X importtime's report, top-level imports only
+	times = {}
+	for line in stderr.splitlines():
+		if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+			continue
+		self_us, cumulative, name = line[len("import time:"):].split("|")
+		times[name.rstrip()] = int(cumulative)
+	return times
+
+
+
+
+def listed_codes(stdout):
+	# the BCP-47 codes of the rows -L printed
+	return [line.split("\t")[1].strip() for line in stdout.splitlines() if "\t" in line and not line.startswith("Name")]
+
+
+
+
+def measure(script, args, repeat):
+	walls = []
+	for i in range(repeat):
+		start = time.perf_counter()
+		proc = subprocess.run([sys.executable, "-X", "importtime", script] + args, capture_output=True, text=True)
+		walls.append(time.perf_counter() - start)
+	return statistics.median(walls), import_times(proc.stderr), proc.stdout
+
+
+
+
+def main(args):
+	with tempfile.TemporaryDirectory(prefix="elan-asr-bench-") as work_dir:
+		eaf = write_eaf(f"{work_dir}/startup.eaf", f"{work_dir}/media.wav", tiers=1, annotations=10)
+		commands = {"--help": ["--help"], "-L": ["-L"], "-L french diarization": ["-L", "french", "diarization"], "-L de": ["-L", "de"], "-L ar": ["-L", "ar"], "-L en": ["-L", "en"], "-M": ["-e", eaf, "-M"], "--submit": ["-e", eaf, "--submit", "--socket", f"{work_dir}/no-server.sock"]}
+		# language codes given to -L, which must list those languages' rows & nothing else (not e.g. every row with a feature whose name contains the code)
+		codes = {"-L de": "de", "-L ar": "ar", "-L en": "en"}
+		failed = False
+		print(f"{os.path.relpath(args.script)}, median of {args.repeat} runs")
+		for name, command in commands.items():
+			wall, times, stdout = measure(args.script, command, args.repeat)
+			heavy = sorted(set(module.strip().split(".")[0] for module in times) & set(HEAVY))
+			slowest = sorted(((us, module.strip()) for module, us in times.items() if not module.startswith("  ")), reverse=True)[:args.top]
+			print(f"\n{name:>22}: {wall * 1000:7.1f} ms")
+			for us, module in slowest:
+				print(f"{'':>24}{us / 1000:7.1f} ms  {module}")
+			if heavy:
+				failed = True
+				print(f"{'':>24}imports {', '.join(heavy)} without needing them")
+			if name in codes:
+				listed = listed_codes(stdout)
+				others = sorted(set(code for code in listed if not code.startswith(f"{codes[name]}-")))
+				if not listed or others:
+					failed = True
+					print(f"{'':>24}lists {len(listed)} rows, {len(others)} other languages ({', '.join(others[:5])}) instead of only {codes[name]}-*")
+	sys.exit(1 if failed else 0)
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("--script", type=str, default=os.path.join(REPO, "elan-asr.py"), help="Script to measure.")
+	parser.add_argument("-r", "--repeat", type=int, default=5, help="Runs per command.")
+	parser.add_argument("--top", type=int, default=5, help="Number of slowest top-level imports to show per command.")
+	main(parser.parse_args())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compare reading & writing back one tier of a large Elan file with the default path (et.parse + pretty() + tree.write) and with --stream (iterparse + patching the annotation values in place). Reports wall time & peak resident memory of each, every mode running in its own process.
+"""
+from argparse import RawTextHelpFormatter
+from concurrent.futures import ProcessPoolExecutor
+import argparse, os, resource, shutil, tempfile, time
+import xml.etree.ElementTree as et
+from synth import load_elan_asr, write_eaf
+
+
+
+
+def default_path(elan_asr, eaf, tier_id):
+	elan = et.parse(eaf).getroot()
+	index = load_elan_asr("index").AnnotationIndex()
+	elan_asr.index_time_slots(elan, index)
+	elan_asr.index_tier(elan.find(f"TIER[@TIER_ID='{tier_id}']"), index)
+	for alignable, annotation_id, start_time, end_time in index.finish().annotations(tier_id):
+		for val in alignable:
+			val.text = f"transcription of {annotation_id}"
+	elan = elan_asr.pretty(elan)
+	et.ElementTree(elan).write(eaf, encoding="utf-8", xml_declaration=True)
+
+
+
+
+def stream_path(elan_asr, eaf, tier_id):
+	index = load_elan_asr("index").AnnotationIndex()
+	media_urls, values = elan_asr.stream_read_eaf(eaf, index, [tier_id])
+	transcriptions = {annotation_id: f"transcription of {annotation_id}" for alignable, annotation_id, start_time, end_time in index.finish().annotations(tier_id)}
+	elan_asr.stream_patch_eaf(eaf, [tier_id], transcriptions)
+
+
+
+
+def measure(mode, eaf, tier_id):
+	# runs in a fresh process, so ru_maxrss is this mode's own peak (in KB on Linux)
+	elan_asr = load_elan_asr("eaf")
+	baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	start = time.perf_counter()
+	MODES[mode](elan_asr, eaf, tier_id)
+	wall = time.perf_counter() - start
+	return wall, baseline, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+
+
+MODES = {"default": default_path, "stream": stream_path}
+
+
+
+
+def main(args):
+	work_dir = tempfile.mkdtemp(prefix="elan-asr-bench-")
+	try:
+		source = write_eaf(f"{work_dir}/source.eaf", f"{work_dir}/media.wav", args.tiers, args.annotations // args.tiers)
+		print(f"{args.annotations} annotations on {args.tiers} tiers, {os.path.getsize(source) / 1024 ** 2:.1f} MB")
+		for mode in args.modes:
+			eaf = shutil.copy(source, f"{work_dir}/{mode}.eaf")
+			with ProcessPoolExecutor(max_workers=1) as pool:
+				wall, baseline, peak = pool.submit(measure, mode, eaf, "tier1").result()
+			print(f"{mode:>8}: {wall:7.2f} s	peak RSS {peak / 1024:7.1f} MB ({(peak - baseline) / 1024:+.1f} MB over startup)")
+	finally:
+		shutil.rmtree(work_dir)
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-n", "--annotations", type=int, default=100000, help="Total number of annotations in the synthetic file.")
+	parser.add_argument("-T", "--tiers", type=int, default=4, help="Number of tiers the annotations are spread over; only the first one is recognized.")
+	parser.add_argument("-m", "--modes", nargs="+", choices=sorted(MODES), default=["default", "stream"], help="Which paths to run.")
+	main(parser.parse_args())
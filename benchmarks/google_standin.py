@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Google Speech Recognition web API, for benchmarking the google backends offline. Answers POSTs to /speech-api/v2/recognize with a response shaped like Google's after `latency` seconds, & makes every new connection wait `handshake` seconds first to stand in for TCP / TLS setup to a remote server. With `bandwidth`, request bodies also take as long as they would over an uplink of that many bytes per second shared by all connections. Keeps connections alive (HTTP/1.1).
+
+Run it on its own & point elan-asr.py at it with `-b google-pooled --google-url http://127.0.0.1:PORT/speech-api/v2/recognize`.
+"""
+from argparse import RawTextHelpFormatter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse, json, threading, time
+
+
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+
+	def setup(self):
+		time.sleep(self.server.handshake)
+		with self.server.lock:
+			self.server.connections += 1
+		super().setup()
+
+	def do_POST(self):
+		audio = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+		if self.server.bandwidth:
+			# the body has to queue for the shared uplink behind the ones before it
+			with self.server.lock:
+				self.server.link_free = max(time.perf_counter(), self.server.link_free) + len(audio) / self.server.bandwidth
+				arrived = self.server.link_free
+			time.sleep(max(0, arrived - time.perf_counter()))
+		time.sleep(self.server.latency)
+		with self.server.lock:
+			self.server.requests += 1
+			self.server.bytes_received += len(audio)
+		result = {"alternative": [{"transcript": f"stand-in {len(audio)} bytes", "confidence": 0.9}], "final": True}
+		body = (json.dumps({"result": []}) + "\n" + json.dumps({"result": [result], "result_index": 0}) + "\n").encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json; charset=utf-8")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+
+
+def start_standin(port=0, latency=0.05, handshake=0.05, bandwidth=0):
+	# serve in a background thread; returns the server (url in server.url, counters in server.connections / .requests / .bytes_received)
+	server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+	server.daemon_threads = True
+	server.latency = latency
+	server.handshake = handshake
+	server.bandwidth = bandwidth
+	server.link_free = 0.0
+	server.lock = threading.Lock()
+	server.connections = 0
+	server.requests = 0
+	server.bytes_received = 0
+	server.url = f"http://127.0.0.1:{server.server_address[1]}/speech-api/v2/recognize"
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-p", "--port", type=int, default=8089, help="Port to listen on.")
+	parser.add_argument("--latency", type=float, default=0.05, help="Seconds to wait before answering each request.")
+	parser.add_argument("--handshake", type=float, default=0.05, help="Seconds each new connection waits before its first request is read.")
+	parser.add_argument("--bandwidth", type=float, default=0, help="Uplink in bytes per second shared by all connections (0: unlimited).")
+	args = parser.parse_args()
+	server = start_standin(args.port, args.latency, args.handshake, args.bandwidth)
+	print(f"Listening on {server.url}; Ctrl-C to stop.")
+	try:
+		threading.Event().wait()
+	except KeyboardInterrupt:
+		print(f"{server.requests} requests over {server.connections} connections, {server.bytes_received} bytes of audio")
@@ -0,0 +1,87 @@
+"""
+Helpers shared by the benchmarks: import the elan_asr package from this checkout & generate synthetic Elan files shaped like the ones ELAN writes, with matching media, & speech-like audio.
+"""
+import importlib, os, sys, wave
+import numpy as np
+from xml.sax.saxutils import quoteattr
+
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+
+
+def load_elan_asr(module):
+	# e.g. load_elan_asr("eaf") for elan_asr.eaf, imported from this checkout rather than anything installed
+	if REPO not in sys.path:
+		sys.path.insert(0, REPO)
+	return importlib.import_module(f"elan_asr.{module}")
+
+
+
+
+def write_eaf(path, media_path, tiers=4, annotations=1000, duration=700, gap=300, text=""):
+	"""
+	Write an Elan file with `tiers` tiers of `annotations` alignable annotations each, `duration` ms long & `gap` ms apart. All tiers share the same time slots, as overlapping speakers' tiers often nearly do.
+	"""
+	with open(path, 'w', encoding="utf-8") as outf:
+		outf.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+		outf.write('<ANNOTATION_DOCUMENT AUTHOR="" DATE="2023-04-16T00:00:00+02:00" FORMAT="3.0" VERSION="3.0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://www.mpi.nl/tools/elan/EAFv3.0.xsd">\n')
+		outf.write('    <HEADER MEDIA_FILE="" TIME_UNITS="milliseconds">\n')
+		outf.write(f'        <MEDIA_DESCRIPTOR MEDIA_URL={quoteattr("file://" + os.path.abspath(media_path))} MIME_TYPE="audio/x-wav" RELATIVE_MEDIA_URL={quoteattr("./" + os.path.basename(media_path))}/>\n')
+		outf.write(f'        <PROPERTY NAME="lastUsedAnnotationId">{tiers * annotations}</PROPERTY>\n')
+		outf.write('    </HEADER>\n')
+		outf.write('    <TIME_ORDER>\n')
+		for i in range(annotations):
+			start = i * (duration + gap) + gap
+			outf.write(f'        <TIME_SLOT TIME_SLOT_ID="ts{2 * i + 1}" TIME_VALUE="{start}"/>\n')
+			outf.write(f'        <TIME_SLOT TIME_SLOT_ID="ts{2 * i + 2}" TIME_VALUE="{start + duration}"/>\n')
+		outf.write('    </TIME_ORDER>\n')
+		for t in range(tiers):
+			outf.write(f'    <TIER LINGUISTIC_TYPE_REF="default-lt" PARTICIPANT="speaker{t + 1}" TIER_ID="tier{t + 1}">\n')
+			for i in range(annotations):
+				outf.write('        <ANNOTATION>\n')
+				outf.write(f'            <ALIGNABLE_ANNOTATION ANNOTATION_ID="a{t * annotations + i + 1}" TIME_SLOT_REF1="ts{2 * i + 1}" TIME_SLOT_REF2="ts{2 * i + 2}">\n')
+				outf.write(f'                <ANNOTATION_VALUE>{text}</ANNOTATION_VALUE>\n')
+				outf.write('            </ALIGNABLE_ANNOTATION>\n')
+				outf.write('        </ANNOTATION>\n')
+			outf.write('    </TIER>\n')
+		outf.write('    <LINGUISTIC_TYPE GRAPHIC_REFERENCES="false" LINGUISTIC_TYPE_ID="default-lt" TIME_ALIGNABLE="true"/>\n')
+		outf.write('    <CONSTRAINT DESCRIPTION="Time subdivision of parent annotation\'s time interval, no time gaps allowed within this interval" STEREOTYPE="Time_Subdivision"/>\n')
+		outf.write('    <CONSTRAINT DESCRIPTION="Symbolic association of an annotation" STEREOTYPE="Symbolic_Association"/>\n')
+		outf.write('</ANNOTATION_DOCUMENT>\n')
+	return path
+
+
+
+
+def write_wav(path, annotations=1000, duration=700, gap=300, sample_rate=16000, seed=0):
+	"""
+	Write mono 16-bit media matching `write_eaf` with the same timing: noise bursts (loud enough to pass the silence check) where the annotations are & near-silence in the gaps. Written in chunks, so hour-long media don't need to fit in memory twice.
+	"""
+	rng = np.random.default_rng(seed)
+	speech = duration * sample_rate // 1000
+	pause = gap * sample_rate // 1000
+	with wave.open(path, 'wb') as outw:
+		outw.setnchannels(1)
+		outw.setsampwidth(2)
+		outw.setframerate(sample_rate)
+		for i in range(annotations):
+			outw.writeframes((rng.standard_normal(pause) * 3).astype(np.int16).tobytes())
+			outw.writeframes((rng.standard_normal(speech) * 3000).astype(np.int16).tobytes())
+		outw.writeframes((rng.standard_normal(pause) * 3).astype(np.int16).tobytes())
+	return path
+
+
+
+
+def speech_like(duration, sample_rate, seed):
+	# voiced "syllables": a few harmonics of a wandering pitch under a syllable-rate envelope, over a low noise floor; compresses roughly like speech, unlike white noise
+	rng = np.random.default_rng(seed)
+	t = np.arange(int(duration * sample_rate)) / sample_rate
+	f0 = 120 + 40 * np.sin(2 * np.pi * rng.uniform(0.5, 2) * t + rng.uniform(0, 2 * np.pi))
+	phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+	voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+	envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None) ** 2
+	signal = voice * envelope * 6000 + rng.standard_normal(len(t)) * 30
+	return signal.astype(np.int16)
@@ -0,0 +1,3 @@
+"""
+Automatic speech recognition for the annotations of Elan files. Run it as `python elan-asr.py` or `python -m elan_asr`; the command line lives in elan_asr.cli.
+"""
@@ -0,0 +1,126 @@
+"""
+Decoding media to PCM once per file, cutting annotations out of it & the energy measures behind the silence check & splitting.
+"""
+import subprocess, wave
+import numpy as np
+from .common import SAMPLE_RATE, SAMPLE_WIDTH
+
+
+
+
+def pcm_command(media, output, sample_rate=SAMPLE_RATE):
+	# ffmpeg decoding `media` to raw mono 16 bit PCM in `output` (a file, or pipe:1)
+	return [
+		"ffmpeg", 
+		"-loglevel", "fatal", 
+		"-hide_banner", 
+		"-nostdin",
+		"-y",
+		"-i", media,
+		"-vn",
+		"-ac", "1",
+		"-ar", f"{sample_rate}",
+		"-f", "s16le",
+		output
+	]
+
+
+
+
+def decode_media(media, sample_rate=SAMPLE_RATE):
+	# decode once to raw mono PCM in memory; annotations are cut out of this as views
+	proc = subprocess.run(pcm_command(media, "pipe:1", sample_rate), stdout=subprocess.PIPE)
+	if proc.returncode != 0:
+		return None
+	return np.frombuffer(proc.stdout, dtype="<i2")
+
+
+
+
+def write_wav(path, segment, sample_rate=SAMPLE_RATE):
+	with wave.open(path, "wb") as outw:
+		outw.setnchannels(1)
+		outw.setsampwidth(SAMPLE_WIDTH)
+		outw.setframerate(sample_rate)
+		outw.writeframes(segment.tobytes())
+
+
+
+
+def slice_media(pcm, annotation_id, start_time, end_time, tmp_dir, keep_tmp=False, sample_rate=SAMPLE_RATE):
+	start = start_time * sample_rate // 1000
+	end = end_time * sample_rate // 1000
+	segment = pcm[start:end]
+	if keep_tmp:
+		write_wav(f"{tmp_dir}/{annotation_id}.wav", segment, sample_rate)
+	return segment
+
+
+
+
+def frame_energy(pcm, sample_rate=SAMPLE_RATE, frame=0.03):
+	# RMS level (dBFS) of each consecutive `frame`-second frame, computed a block of frames at a time to bound memory on long media
+	n = int(frame * sample_rate)
+	frames = len(pcm) // n
+	rms = np.empty(frames)
+	step = max(1, (1 << 22) // n)
+	for b in range(0, frames, step):
+		x = np.asarray(pcm[b * n:min(b + step, frames) * n], dtype=np.float32).reshape(-1, n)
+		rms[b:b + len(x)] = np.sqrt(np.mean(x * x, axis=1))
+	return 20 * np.log10(np.maximum(rms, 1.0) / 32768)
+
+
+
+
+def has_speech(segment, threshold=-50.0, min_speech=0.1, sample_rate=SAMPLE_RATE, frame=0.03):
+	# at least min_speech seconds of frames louder than threshold dBFS
+	return np.count_nonzero(frame_energy(segment, sample_rate, frame) > threshold) * frame >= min_speech
+
+
+
+
+def split_points(segment, max_len, sample_rate=SAMPLE_RATE, frame=0.03):
+	# where to cut a segment longer than max_len seconds: at the quietest moment (smoothed over ~150 ms) in the second half of each max_len window, so cuts land in pauses where there are any
+	n = int(frame * sample_rate)
+	energy = frame_energy(segment, sample_rate, frame)
+	if len(energy) >= 5:
+		energy = np.convolve(energy, np.ones(5) / 5, mode="same")
+	window = max(2, int(max_len / frame)) # at least two frames, so every cut moves forward
+	points = []
+	start = 0
+	while len(segment) - start * n > max_len * sample_rate and start + window // 2 < len(energy):
+		cut = start + window // 2 + int(np.argmin(energy[start + window // 2:start + window]))
+		points.append(cut * n + n // 2)
+		start = cut
+	return points
+
+
+
+
+def speech_segments(pcm, threshold=-50.0, min_len=0.5, max_len=15.0, min_pause=0.3, pad=0.1, sample_rate=SAMPLE_RATE, frame=0.03):
+	# [(start ms, end ms)] of the speech in `pcm`: runs of frames louder than threshold dBFS, joined across pauses shorter than min_pause seconds & padded by `pad` seconds; shorter than min_len they are dropped, longer than max_len cut at pauses (split_points)
+	energy = frame_energy(pcm, sample_rate, frame)
+	edges = np.diff(np.r_[False, energy > threshold, False].astype(np.int8))
+	starts = np.flatnonzero(edges == 1)
+	ends = np.flatnonzero(edges == -1)
+	if not len(starts):
+		return []
+	# a run that follows a long enough pause starts a new segment; the others are joined to the one before
+	first = np.r_[True, (starts[1:] - ends[:-1]) * frame >= min_pause]
+	starts, ends = starts[first], ends[np.r_[first[1:], True]]
+	duration = len(pcm) * 1000 // sample_rate
+	starts = np.maximum(np.rint((starts * frame - pad) * 1000).astype(np.int64), 0)
+	ends = np.minimum(np.rint((ends * frame + pad) * 1000).astype(np.int64), duration)
+	ends[:-1] = np.minimum(ends[:-1], starts[1:])
+	keep = ends - starts >= min_len * 1000
+	segments = []
+	for start, end in zip(starts[keep].tolist(), ends[keep].tolist()):
+		if end - start <= max_len * 1000:
+			segments.append((start, end))
+			continue
+		cuts = [start + point * 1000 // sample_rate for point in split_points(pcm[start * sample_rate // 1000:end * sample_rate // 1000], max_len, sample_rate, frame)]
+		if end - cuts[-1] < min_len * 1000:
+			# the last cut would leave a scrap: cut the last two pieces in half instead
+			cuts[-1] = ((cuts[-2] if len(cuts) > 1 else start) + end) // 2
+		segments.extend(zip([start] + cuts, cuts + [end]))
+	return segments
@@ -0,0 +1,584 @@
+"""
+ASR engines & the wrappers that throttle, retry, split & pack requests to them.
+"""
+from urllib.error import HTTPError, URLError
+import json, os, random, threading, time
+import numpy as np
+import requests
+import speech_recognition as sr
+from .audio import split_points
+from .common import ElanAsrError, GOOGLE_KEY, GOOGLE_URL, RETRY_CODES, SAMPLE_RATE, SAMPLE_WIDTH
+from .metrics import Metrics
+from .pipeline import run_pipeline
+
+
+
+
+def encode_audio(segment, encoding, sample_rate=SAMPLE_RATE):
+	# request body & content type for a mono 16 bit segment: lossless FLAC, or raw big-endian PCM (L16) as the Google API also takes it
+	if encoding == "flac":
+		return sr.AudioData(segment.tobytes(), sample_rate, SAMPLE_WIDTH).get_flac_data(convert_width=2), f"audio/x-flac; rate={sample_rate}"
+	return segment.astype(">i2").tobytes(), f"audio/l16; rate={sample_rate}"
+
+
+
+
+class EncodedAudio(sr.AudioData):
+	"""
+	AudioData that hands recognize_google the FLAC body encode() already made, instead of encoding the segment again.
+	"""
+	def __init__(self, segment, sample_rate, flac):
+		super().__init__(segment.tobytes(), sample_rate, SAMPLE_WIDTH)
+		self.flac = flac
+
+	def get_flac_data(self, convert_rate=None, convert_width=None):
+		return self.flac
+
+
+
+
+class Backend:
+	"""
+	An ASR engine. `recognize` takes a batch of (at most `batch_size`) mono 16 bit PCM segments & returns one response per segment, shaped like Google's `show_all` response: {"alternative": [{"transcript": ..., "confidence": ...}, ...]} or [] when nothing was recognized. Backends with `word_timings` also return "words": [{"word": ..., "start": ..., "end": ...}] (seconds from the start of the segment, words carrying their own leading space as Whisper's do), with a "probability" (0-1) per word where the engine gives one. Failures are raised as sr.RequestError / sr.UnknownValueError for the whole batch. Engines behind a web API upload each segment as `encoding` (see encode); local ones have none.
+	"""
+	name = None
+	batch_size = 1
+	word_timings = False
+	encoding = None
+
+	def __init__(self, model=None, metrics=None):
+		self.model = model
+		self.recognizer = sr.Recognizer()
+		self.metrics = metrics or Metrics()
+		self.lock = threading.Lock()
+		self.sent_segments = 0
+		self.sent_bytes = 0
+		self.pcm_bytes = 0
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		raise NotImplementedError
+
+	def encode(self, segment, sample_rate=SAMPLE_RATE):
+		# the upload for one segment, counted as sent (again on a retry, as it is sent again)
+		with self.metrics.time("encode"):
+			payload, content_type = encode_audio(segment, self.encoding, sample_rate)
+		self.metrics.count("audio_segments_sent")
+		self.metrics.count("audio_bytes_sent", len(payload))
+		with self.lock:
+			self.sent_segments += 1
+			self.sent_bytes += len(payload)
+			self.pcm_bytes += segment.nbytes
+		return payload, content_type
+
+	def stats(self):
+		# lines for the end-of-file summary, if the backend counts anything
+		if not self.sent_segments:
+			return []
+		return [f"sent {self.sent_segments} segments as {self.encoding}: {self.sent_bytes / 1024:.0f} kB, {self.sent_bytes / self.sent_segments / 1024:.1f} kB per segment ({self.sent_bytes / max(self.pcm_bytes, 1):.0%} of the PCM)"]
+
+	def status(self):
+		# live state to show next to the progress bar
+		return {}
+
+	def reset_counters(self):
+		with self.lock:
+			self.sent_segments = 0
+			self.sent_bytes = 0
+			self.pcm_bytes = 0
+
+
+
+
+class GoogleBackend(Backend):
+	"""
+	The Google web API through SpeechRecognition's recognize_google, which always uploads FLAC.
+	"""
+	name = "google"
+	encoding = "flac"
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		responses = []
+		for segment in segments:
+			flac, content_type = self.encode(segment, sample_rate)
+			responses.append(self.recognizer.recognize_google(EncodedAudio(segment, sample_rate, flac), language=lang, show_all=True))
+		return responses
+
+
+
+
+class GooglePooledBackend(Backend):
+	"""
+	The same Google web API as GoogleBackend, but requests go through one keep-alive requests.Session with a connection pool sized to --jobs, so consecutive requests reuse open connections instead of setting up a new one each (as recognize_google does). `url` can point at a local stand-in server for benchmarking. Uploads FLAC, or raw PCM with `encoding="l16"`.
+	"""
+	name = "google-pooled"
+
+	def __init__(self, model=None, url=GOOGLE_URL, pool_size=1, encoding="flac", metrics=None):
+		super().__init__(model, metrics)
+		self.url = url
+		self.encoding = encoding
+		self.session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+		self.session.mount("http://", adapter)
+		self.session.mount("https://", adapter)
+
+	@staticmethod
+	def parse_response(text):
+		# the API sends one JSON object per line, the first often with an empty result; same as recognize_google(show_all=True)
+		for line in text.split("\n"):
+			if not line:
+				continue
+			result = json.loads(line)["result"]
+			if result:
+				return result[0]
+		return []
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		responses = []
+		for segment in segments:
+			payload, content_type = self.encode(segment, sample_rate)
+			params = {"client": "chromium", "lang": lang, "key": GOOGLE_KEY, "pFilter": 0}
+			# errors are raised like recognize_google's, from urllib's, so transient_error can tell what's worth retrying
+			try:
+				response = self.session.post(self.url, params=params, data=payload, headers={"Content-Type": content_type}, timeout=self.recognizer.operation_timeout)
+			except requests.Timeout as e:
+				raise sr.RequestError(f"recognition connection failed: {e}") from TimeoutError(str(e))
+			except requests.ConnectionError as e:
+				raise sr.RequestError(f"recognition connection failed: {e}") from URLError(str(e))
+			if response.status_code >= 400:
+				raise sr.RequestError(f"recognition request failed: {response.reason}") from HTTPError(response.url, response.status_code, response.reason, response.headers, None)
+			responses.append(self.parse_response(response.content.decode("utf-8")))
+		return responses
+
+
+
+
+class StubBackend(Backend):
+	"""
+	Deterministic local stand-in for testing & load-testing without network access: "transcribes" each stretch of non-silent audio in a segment as a word giving its length, returns [] for digital silence & sleeps `latency` seconds per batch. With `failure_rate`, that fraction of requests fails the way an overloaded API does (HTTP 429 / 503).
+	"""
+	name = "stub"
+	batch_size = 32
+	word_timings = True
+
+	def __init__(self, model=None, latency=0.0, failure_rate=0.0):
+		super().__init__(model)
+		self.latency = latency
+		self.failure_rate = failure_rate
+		self.random = random.Random(0)
+		self.lock = threading.Lock()
+
+	@staticmethod
+	def voiced_runs(segment, sample_rate=SAMPLE_RATE, min_gap=0.01):
+		# (start, end) sample ranges of non-zero audio, merging runs split by less than min_gap seconds of digital silence
+		nonzero = np.flatnonzero(segment)
+		if len(nonzero) == 0:
+			return []
+		breaks = np.flatnonzero(np.diff(nonzero) > min_gap * sample_rate)
+		starts = np.concatenate(([nonzero[0]], nonzero[breaks + 1]))
+		ends = np.concatenate((nonzero[breaks], [nonzero[-1]])) + 1
+		return list(zip(starts.tolist(), ends.tolist()))
+
+	@staticmethod
+	def loudness(audio):
+		# the stub's "confidence": louder is surer
+		rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+		return round(min(rms / 32768 * 10, 1.0), 4)
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		if self.latency:
+			time.sleep(self.latency)
+		if self.failure_rate:
+			with self.lock:
+				fail = self.random.random() < self.failure_rate
+				code = self.random.choice((429, 503))
+			if fail:
+				raise sr.RequestError("recognition request failed: stub failure") from HTTPError("stub://", code, "stub failure", {}, None)
+		responses = []
+		for segment in segments:
+			words = [
+				{"word": f" {lang}:{(end - start) * 1000 // sample_rate}ms", "start": start / sample_rate, "end": end / sample_rate, "probability": self.loudness(segment[start:end])}
+				for start, end in self.voiced_runs(segment, sample_rate)
+			]
+			if not words:
+				responses.append([])
+				continue
+			responses.append({
+				"alternative": [{"transcript": "".join(w["word"] for w in words).strip(), "confidence": self.loudness(segment)}],
+				"words": words,
+				"final": True
+			})
+		return responses
+
+
+
+
+class WhisperBackend(Backend):
+	name = "whisper"
+	word_timings = True
+
+	def __init__(self, model=None):
+		super().__init__(model or "base")
+		self.lock = threading.Lock()
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		language = lang.split("-")[0].lower() if lang else None # without -l, whisper detects the language itself
+		responses = []
+		for segment in segments:
+			audio = sr.AudioData(segment.tobytes(), sample_rate, SAMPLE_WIDTH)
+			with self.lock: # one model instance, not safe to share between threads
+				result = self.recognizer.recognize_whisper(audio, model=self.model, show_dict=True, language=language, word_timestamps=True)
+			text = result["text"].strip()
+			if not text:
+				responses.append([])
+				continue
+			logprobs = [seg["avg_logprob"] for seg in result.get("segments", [])]
+			alternative = {"transcript": text}
+			if logprobs:
+				alternative["confidence"] = round(float(np.exp(np.mean(logprobs))), 4)
+			responses.append({
+				"alternative": [alternative],
+				"language": result.get("language"),
+				"segments": [{"start": seg["start"], "end": seg["end"], "text": seg["text"]} for seg in result.get("segments", [])],
+				"words": [{"word": w["word"], "start": w["start"], "end": w["end"], "probability": round(w["probability"], 4)} for seg in result.get("segments", []) for w in seg.get("words", [])],
+				"final": True
+			})
+		return responses
+
+
+
+
+class VoskBackend(Backend):
+	name = "vosk"
+
+	def __init__(self, model=None):
+		super().__init__(model or "model")
+		if not os.path.isdir(self.model):
+			raise ElanAsrError(f"Vosk model not found at '{self.model}'. Download one from https://alphacephei.com/vosk/models, unpack it & pass its folder with --model.")
+		from vosk import Model
+		self.recognizer.vosk_model = Model(self.model)
+		self.lock = threading.Lock()
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		responses = []
+		for segment in segments:
+			audio = sr.AudioData(segment.tobytes(), sample_rate, SAMPLE_WIDTH)
+			with self.lock:
+				result = json.loads(self.recognizer.recognize_vosk(audio))
+			text = result.get("text", "").strip()
+			responses.append({"alternative": [{"transcript": text}], "final": True} if text else [])
+		return responses
+
+
+
+
+class BackendWrapper(Backend):
+	"""
+	Base for stages that sit between the pipeline & an ASR engine; passes on to `inner` whatever it doesn't change.
+	"""
+	def __init__(self, inner):
+		self.inner = inner
+		self.name = inner.name
+		self.model = inner.model
+		self.batch_size = inner.batch_size
+		self.word_timings = inner.word_timings
+		self.encoding = inner.encoding
+		self.lock = threading.Lock()
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		return self.inner.recognize(segments, lang, sample_rate)
+
+	def stats(self):
+		return self.inner.stats()
+
+	def status(self):
+		return self.inner.status()
+
+	def reset_counters(self):
+		self.inner.reset_counters()
+
+
+
+
+def transient_error(error):
+	# (worth retrying?, seconds the server asked us to wait) for an sr.RequestError; SpeechRecognition raises these from the urllib error
+	cause = error.__cause__ or error.__context__
+	if isinstance(cause, HTTPError):
+		try:
+			retry_after = float(cause.headers.get("Retry-After"))
+		except (AttributeError, TypeError, ValueError):
+			retry_after = None
+		return cause.code in RETRY_CODES, retry_after
+	return isinstance(cause, (URLError, TimeoutError, ConnectionError)), None
+
+
+
+
+class ThrottledBackend(BackendWrapper):
+	"""
+	Schedules the requests to the engine. A request waits for a token (at most `rate` requests per second, 0 for no limit), for a slot of the shared `limit` (a threading or multiprocessing semaphore holding the --jobs budget) & for room in an AIMD concurrency window: the window grows by one request per window of successes up to `jobs` & halves when requests fail, at most once per `backoff` seconds. Transient failures (HTTP 408/429/5xx, connection errors) are retried up to `retries` times after a jittered exponential backoff, or after the server's Retry-After if that is longer.
+	"""
+	def __init__(self, inner, limit, jobs=1, rate=0.0, retries=5, backoff=1.0, max_backoff=60.0, metrics=None):
+		super().__init__(inner)
+		self.metrics = metrics or Metrics()
+		self.limit = limit
+		self.max_window = float(jobs)
+		self.window = float(jobs)
+		self.in_flight = 0
+		self.cond = threading.Condition()
+		self.decreased = 0.0
+		self.rate = rate
+		self.tokens = 1.0
+		self.stamp = time.monotonic()
+		self.retries = retries
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self.random = random.Random()
+		self.reset_counters()
+
+	def take_token(self):
+		if not self.rate:
+			return
+		with self.lock:
+			now = time.monotonic()
+			self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.stamp) * self.rate)
+			self.stamp = now
+			self.tokens -= 1
+			wait = -self.tokens / self.rate if self.tokens < 0 else 0
+		if wait:
+			time.sleep(wait)
+
+	def release(self, failed):
+		with self.cond:
+			self.in_flight -= 1
+			if failed:
+				now = time.monotonic()
+				if now - self.decreased >= self.backoff:
+					self.window = max(1.0, self.window / 2)
+					self.decreased = now
+			else:
+				self.window = min(self.max_window, self.window + 1 / self.window)
+			self.cond.notify_all()
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		attempt = 0
+		while True:
+			with self.cond:
+				while self.in_flight >= int(self.window):
+					self.cond.wait()
+				self.in_flight += 1
+			failed = True
+			try:
+				self.take_token()
+				with self.limit, self.metrics.time("request"):
+					self.metrics.count("requests")
+					responses = self.inner.recognize(segments, lang, sample_rate)
+				failed = False
+				return responses
+			except sr.RequestError as e:
+				transient, retry_after = transient_error(e)
+				if not transient or attempt >= self.retries:
+					with self.lock:
+						self.failures += 1
+					raise
+			finally:
+				self.release(failed)
+			delay = max(retry_after or 0, self.random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+			with self.lock:
+				self.retried += 1
+			self.metrics.count("retries")
+			attempt += 1
+			time.sleep(delay)
+
+	def stats(self):
+		lines = [f"{self.retried} requests retried, {self.failures} failed for good"] if self.retried or self.failures else []
+		return lines + self.inner.stats()
+
+	def status(self):
+		return {"window": f"{self.window:.1f}", "in flight": self.in_flight, "retries": self.retried, **self.inner.status()}
+
+	def reset_counters(self):
+		self.retried = 0
+		self.failures = 0
+		super().reset_counters()
+
+
+
+
+class SplittingBackend(BackendWrapper):
+	"""
+	Cuts segments longer than `limit` seconds into chunks at pauses (see split_points), recognizes the chunks, `jobs` requests at a time, & stitches their transcripts back into one response per segment.
+	"""
+	def __init__(self, inner, limit=25.0, jobs=1):
+		super().__init__(inner)
+		self.name = f"{inner.name}+split{limit:g}" # stitched responses are cached apart from whole ones & other limits'
+		self.limit = limit
+		self.jobs = jobs
+		self.reset_counters()
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		chunks = []
+		for i, segment in enumerate(segments):
+			if len(segment) > self.limit * sample_rate:
+				bounds = [0] + split_points(segment, self.limit, sample_rate) + [len(segment)]
+				chunks += [(i, start, segment[start:end]) for start, end in zip(bounds, bounds[1:])]
+			else:
+				chunks.append((i, 0, segment))
+		if len(chunks) == len(segments):
+			return self.inner.recognize(segments, lang, sample_rate)
+		split = set(i for i, start, chunk in chunks if start > 0)
+		with self.lock:
+			self.split += len(split)
+			self.chunks += sum(1 for i, start, chunk in chunks if i in split)
+		batches = [chunks[b:b + self.inner.batch_size] for b in range(0, len(chunks), self.inner.batch_size)]
+		recognize = lambda batch: self.inner.recognize([chunk for i, start, chunk in batch], lang, sample_rate)
+		chunk_responses = [[] for _ in segments]
+		for batch, responses in run_pipeline(batches, recognize, self.jobs):
+			for (i, start, chunk), response in zip(batch, responses):
+				chunk_responses[i].append((start, len(chunk), response))
+		return [self.stitch(parts, sample_rate) for parts in chunk_responses]
+
+	def stitch(self, parts, sample_rate=SAMPLE_RATE):
+		if len(parts) == 1:
+			return parts[0][2]
+		transcripts = []
+		words = []
+		chunk_info = []
+		weighted = []
+		for start, length, response in parts:
+			transcript = response["alternative"][0]["transcript"].strip() if response else ""
+			chunk_info.append({"start": start / sample_rate, "end": (start + length) / sample_rate, "transcript": transcript})
+			if not transcript:
+				continue
+			transcripts.append(transcript)
+			words += [dict(w, start=w["start"] + start / sample_rate, end=w["end"] + start / sample_rate) for w in response.get("words", [])]
+			if "confidence" in response["alternative"][0]:
+				weighted.append((response["alternative"][0]["confidence"], length))
+		if not transcripts:
+			return []
+		alternative = {"transcript": " ".join(transcripts)}
+		if weighted:
+			alternative["confidence"] = round(sum(c * l for c, l in weighted) / sum(l for c, l in weighted), 4)
+		stitched = {"alternative": [alternative], "chunks": chunk_info, "final": True}
+		if words:
+			stitched["words"] = words
+		return stitched
+
+	def stats(self):
+		return [f"split {self.split} over-long annotations into {self.chunks} chunks"] + self.inner.stats() if self.split else self.inner.stats()
+
+	def reset_counters(self):
+		self.split = 0
+		self.chunks = 0
+		super().reset_counters()
+
+
+
+
+class PackingBackend(BackendWrapper):
+	"""
+	Wraps a backend with word timings & sends it short segments packed together into one request, `gap` seconds of silence apart & at most `limit` seconds long, so that dense tiers of backchannels cost a fraction of the requests. Each word of the response goes back to the segment it falls in. Segments longer than `limit` are sent on their own.
+	"""
+	def __init__(self, inner, limit=15.0, gap=0.3):
+		super().__init__(inner)
+		self.name = f"{inner.name}+pack"
+		self.batch_size = max(64, inner.batch_size)
+		self.limit = limit
+		self.gap = gap
+		self.reset_counters()
+
+	def pack(self, segments, sample_rate=SAMPLE_RATE):
+		# greedily group consecutive segments into packs no longer than limit, separators included
+		limit = int(self.limit * sample_rate)
+		gap = int(self.gap * sample_rate)
+		packs = []
+		pack_len = 0
+		for i, segment in enumerate(segments):
+			if packs and pack_len + gap + len(segment) <= limit:
+				packs[-1].append(i)
+				pack_len += gap + len(segment)
+			else:
+				packs.append([i])
+				pack_len = len(segment)
+		return packs
+
+	def recognize(self, segments, lang, sample_rate=SAMPLE_RATE):
+		gap = np.zeros(int(self.gap * sample_rate), dtype=segments[0].dtype) if segments else None
+		packs = self.pack(segments, sample_rate)
+		audio = []
+		offsets = []
+		for pack in packs:
+			pieces = []
+			pack_offsets = []
+			position = 0
+			for k, i in enumerate(pack):
+				if k:
+					pieces.append(gap)
+					position += len(gap)
+				pieces.append(segments[i])
+				pack_offsets.append((position, position + len(segments[i])))
+				position += len(segments[i])
+			audio.append(pieces[0] if len(pieces) == 1 else np.concatenate(pieces))
+			offsets.append(pack_offsets)
+		packed_responses = []
+		for b in range(0, len(audio), self.inner.batch_size):
+			packed_responses += self.inner.recognize(audio[b:b + self.inner.batch_size], lang, sample_rate)
+		with self.lock:
+			self.segments += len(segments)
+			self.requests += len(packs)
+
+		responses = [None] * len(segments)
+		for pack, pack_offsets, response in zip(packs, offsets, packed_responses):
+			if len(pack) == 1:
+				responses[pack[0]] = response
+				continue
+			words = response.get("words", []) if response else []
+			# a word belongs to the piece its midpoint falls in, with the silence between pieces split down the middle
+			boundaries = [(pack_offsets[k][1] + pack_offsets[k + 1][0]) / 2 / sample_rate for k in range(len(pack) - 1)]
+			pieces = np.searchsorted(boundaries, [(w["start"] + w["end"]) / 2 for w in words])
+			for k, i in enumerate(pack):
+				shift = pack_offsets[k][0] / sample_rate
+				piece_words = [dict(w, start=w["start"] - shift, end=w["end"] - shift) for w, piece in zip(words, pieces) if piece == k]
+				if not piece_words:
+					responses[i] = []
+					continue
+				alternative = {"transcript": "".join(w["word"] for w in piece_words).strip()}
+				# the pack's confidence is for all of its pieces at once; a piece gets its own only from its words' probabilities
+				if all("probability" in w for w in piece_words):
+					alternative["confidence"] = round(sum(w["probability"] for w in piece_words) / len(piece_words), 4)
+				responses[i] = {"alternative": [alternative], "words": piece_words, "packed": True, "final": True}
+		return responses
+
+	def stats(self):
+		return [f"packed {self.segments} annotations into {self.requests} requests"] + self.inner.stats()
+
+	def reset_counters(self):
+		self.segments = 0
+		self.requests = 0
+		super().reset_counters()
+
+
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, GooglePooledBackend, StubBackend, WhisperBackend, VoskBackend)}
+
+
+
+
+def make_backend(args, limit=None, metrics=None):
+	if args.backend == "stub":
+		backend = StubBackend(args.model, args.stub_latency, args.stub_failure_rate)
+	elif args.backend == "google-pooled":
+		backend = GooglePooledBackend(args.model, args.google_url, args.jobs, args.encoding, metrics)
+	elif args.backend == "google":
+		backend = GoogleBackend(args.model, metrics)
+	else:
+		backend = BACKENDS[args.backend](args.model)
+	backend = ThrottledBackend(backend, limit or threading.BoundedSemaphore(args.jobs), args.jobs, args.rate, args.retries, metrics=metrics)
+	if args.max_length:
+		backend = SplittingBackend(backend, args.max_length, args.jobs)
+	if args.pack:
+		if not backend.word_timings:
+			timed = ", ".join(name for name, b in sorted(BACKENDS.items()) if b.word_timings)
+			raise ElanAsrError(f"--pack needs a backend that returns word timings to split results back up ({timed}); {args.backend} doesn't.")
+		backend = PackingBackend(backend, args.pack, args.pack_gap / 1000)
+	return backend
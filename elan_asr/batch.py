@@ -0,0 +1,67 @@
+"""
+Working on a list of Elan files in several processes (-P).
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+import multiprocessing, os
+from .backends import make_backend
+from .common import ElanAsrError, finished_message
+from .metrics import Metrics
+from .pipeline import process_eaf
+from .store import ResultCache
+
+
+
+
+# state of each batch worker process, set up once by init_worker
+worker_state = {}
+
+
+
+
+def init_worker(args, limit):
+	worker_state["args"] = args
+	worker_state["metrics"] = Metrics()
+	try:
+		worker_state["backend"] = make_backend(args, limit, worker_state["metrics"])
+	except ElanAsrError as e:
+		worker_state["error"] = str(e) # e.g. no vosk model: every file this worker gets fails with it, rather than the pool breaking
+	worker_state["cache"] = None if args.no_cache else ResultCache(max_bytes=args.cache_size * 1024 ** 2)
+
+
+
+
+def batch_worker(eaf):
+	if "error" in worker_state:
+		return eaf, worker_state["error"], None
+	try:
+		report = process_eaf(eaf, worker_state["args"], worker_state["backend"], worker_state["cache"], worker_state["metrics"], verbose=False)
+	except Exception as e:
+		return eaf, str(e) if isinstance(e, ElanAsrError) else repr(e), None
+	return eaf, None, report
+
+
+
+
+def run_batch(eafs, args):
+	"""
+	Work on several Elan files at once, one per process, largest first so that long sessions don't end up running alone at the end of the batch. Recognition requests across all processes share one limit of --jobs requests in flight.
+	"""
+	eafs = sorted(eafs, key=lambda e: os.path.getsize(e) if os.path.exists(e) else 0, reverse=True)
+	limit = multiprocessing.BoundedSemaphore(args.jobs)
+	failed = []
+	reports = []
+	with ProcessPoolExecutor(max_workers=args.processes, initializer=init_worker, initargs=(args, limit)) as pool:
+		futures = [pool.submit(batch_worker, eaf) for eaf in eafs]
+		with tqdm(total=len(eafs), unit="file") as pbar:
+			for future in as_completed(futures):
+				eaf, error, report = future.result()
+				if report:
+					reports.append(report)
+				if error:
+					failed.append(eaf)
+					tqdm.write(f"Failed ~~| {eaf} |~~ {error}")
+				else:
+					tqdm.write(finished_message(eaf, report))
+				pbar.update()
+	return failed, reports
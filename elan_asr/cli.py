@@ -0,0 +1,268 @@
+"""
+Automatically run asr on a specified tier of an elan project. This program will read the tier make copies of media segments corresponding to annotation values, send that fragment to an asr API, then populate the return text value in that tier / annotation. Requires FFMPEG on system PATH environment.
+"""
+from argparse import RawTextHelpFormatter
+import argparse, os, sys
+from .common import BACKEND_NAMES, CACHE_PATH, ElanAsrError, ENCODINGS, finished_message, GOOGLE_URL, MEDIA_CACHE_DIR, RESULTS_NAME, SAMPLE_RATE, SOCKET_PATH, unrecognized
+
+
+
+
+def tier_spec(spec):
+	# TIER[:MEDIA_INDEX[:LANGUAGE]] -> (tier id, media index or None, language or None); colons in tier names are kept unless what follows looks like a media index
+	parts = spec.rsplit(":", 2)
+	if len(parts) == 3 and (parts[1].isdigit() or not parts[1]):
+		return parts[0], int(parts[1]) if parts[1] else None, parts[2] or None
+	parts = spec.rsplit(":", 1)
+	if len(parts) == 2 and parts[1].isdigit():
+		return parts[0], int(parts[1]), None
+	return spec, None, None
+
+
+
+
+def elan_files(args):
+	eafs = []
+	if args.elan_file:
+		eafs.append(args.elan_file)
+	elif args.list_elan:
+		with open(args.list_elan, 'r') as inf:
+			es = inf.readlines()
+		[eafs.append(e.strip()) for e in es if e.strip()]
+	return eafs
+
+
+
+
+def results_path(args):
+	# --results, or one store per corpus: next to the Elan file, or the list of them (with neither, in the current directory)
+	if args.results:
+		return os.path.abspath(args.results)
+	corpus = args.list_elan or args.elan_file
+	return os.path.join(os.path.dirname(os.path.abspath(corpus)) if corpus else os.getcwd(), RESULTS_NAME)
+
+
+
+
+def query(args):
+	from . import results
+	eafs = elan_files(args)
+	try:
+		if args.low_confidence is not None:
+			results.print_low_confidence(args.results, args.low_confidence, eafs)
+		elif args.alternatives:
+			results.print_alternatives(args.results, args.alternatives, eafs)
+		else:
+			results.export_json(args.results, args.export_json, eafs)
+	except ElanAsrError as e:
+		print(f"\n\t {e}\n")
+		sys.exit(1)
+
+
+
+
+def main(args):
+	# heavy modules (numpy, speech_recognition, the engines) are only imported once there's work for them
+	import xml.etree.ElementTree as et
+	eafs = elan_files(args)
+
+	if args.media_indexes:
+		from .eaf import find_media_indexes
+		for i, eaf in enumerate(eafs):
+			print(f"Working on --| {eaf} |--	~~ {i+1} of {len(eafs)} ~~")
+			find_media_indexes(et.parse(eaf).getroot())
+		return
+
+	if args.submit:
+		from .server import submit
+		try:
+			failed, reports = submit(eafs, args)
+		except ElanAsrError as e:
+			print(f"\n\t {e}\n")
+			sys.exit(1)
+	else:
+		from .backends import make_backend
+		from .batch import run_batch
+		from .metrics import Metrics
+		from .pipeline import process_eaf
+		from .store import ResultCache
+		if args.processes > 1 and len(eafs) > 1:
+			# each worker process makes its own backend; loading one here as well would only cost time & memory
+			failed, reports = run_batch(eafs, args)
+		else:
+			metrics = Metrics()
+			try:
+				backend = make_backend(args, metrics=metrics)
+			except ElanAsrError as e:
+				print(f"\n\t {e}\n")
+				sys.exit(1)
+			failed = []
+			reports = []
+			cache = None if args.no_cache else ResultCache(max_bytes=args.cache_size * 1024 ** 2)
+			for i, eaf in enumerate(eafs):
+				print(f"Working on --| {eaf} |--	~~ {i+1} of {len(eafs)} ~~")
+				try:
+					report = process_eaf(eaf, args, backend, cache, metrics)
+				except Exception as e:
+					# as batch_worker: whatever is wrong with one file, the rest of the list still gets done
+					failed.append(eaf)
+					print(f"\n\t {e if isinstance(e, ElanAsrError) else repr(e)}\n")
+					print(f"Failed ~~| {eaf} |~~")
+					continue
+				reports.append(report)
+				print(finished_message(eaf, report))
+			if cache:
+				cache.close()
+
+	if args.metrics_out:
+		from .metrics import write_metrics
+		write_metrics(args.metrics_out, reports)
+		print(f"Metrics written to {args.metrics_out}")
+	# files written with annotations left as they were (retries ran out, e.g. on a quota or a storm of 429s) fail the run too, so that scripts can tell
+	partial = [(report["file"], unrecognized(report)) for report in reports if unrecognized(report)]
+	if failed:
+		print(f"\n{len(failed)} of {len(eafs)} Elan files failed:")
+		for eaf in failed:
+			print(f"\t{eaf}")
+	if partial:
+		print(f"\n{len(partial)} of {len(eafs)} Elan files have annotations that could not be recognized (rerun with --resume to retry them):")
+		for eaf, count in partial:
+			print(f"\t{eaf} ({count})")
+	if failed or partial:
+		sys.exit(1)
+
+
+
+
+def build_parser():
+	parser = argparse.ArgumentParser(prog="elan-asr.py", description=__doc__,  formatter_class=RawTextHelpFormatter)
+	parser.add_argument("-e", "--elan-file", type=str, default=None, help="Elan file (.eaf).")
+	parser.add_argument("-E", "--list-elan", type=str, default=None, help="List of Elan files (.eaf).")
+	parser.add_argument("-t", "--tier", type=tier_spec, action="append", default=None, 
+		help="Exact name (case sensitive) of tier to operate on (if tiername contains spaces, wrap arg in quotes). If unset, script will operate on the first/top-level tier. Repeat to do several tiers in one pass; each can be given its own media index & language as TIER:MEDIA_INDEX:LANGUAGE (e.g. 'Speaker B:1:fr-FR', 'Speaker B::fr-FR'), otherwise -m & -l apply.")
+	parser.add_argument("-l", "--language", type=str, help="Language to ASR (Use BCP-47 code).")
+	parser.add_argument("-L", "--language-options", nargs="*", metavar="FILTER", default=None, 
+		help="Print ASR language options. Filters narrow the list down: a language code (e.g. 'fr', 'fr-CA'), a language name or model (part of it will do, e.g. 'french', 'canada', 'latest long') or a feature (its name or start, e.g. diarization, 'word-level confidence'); all of them have to match.")
+	parser.add_argument("-b", "--backend", choices=BACKEND_NAMES, default="google", 
+		help="ASR engine: google (Google Speech Recognition web API, default), google-pooled (the same API over reused keep-alive connections, faster for many short annotations), whisper or vosk (offline, CPU; need the openai-whisper / vosk packages), stub (deterministic fake for testing without network).")
+	parser.add_argument("--model", type=str, default=None, 
+		help="Model for the backend: a whisper model name (default: base) or the path to an unpacked vosk model (default: ./model).")
+	parser.add_argument("--google-url", type=str, default=GOOGLE_URL, 
+		help="Endpoint the google-pooled backend sends requests to, e.g. a local stand-in server for benchmarking.")
+	parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE, 
+		help=f"Rate (Hz) the media is decoded & resampled to, always downmixed to mono, before it's cut up & sent (default: {SAMPLE_RATE}, what the Google API & whisper are tuned for; at least 8000).")
+	parser.add_argument("--encoding", choices=ENCODINGS, default="flac", 
+		help="How google-pooled uploads audio: flac (lossless, about half the bytes of raw PCM for speech, default) or l16 (raw PCM, no encoding cost). The google backend always sends FLAC.")
+	parser.add_argument("--stub-latency", type=float, default=0.0, 
+		help="Seconds the stub backend waits per request, to simulate a network round trip.")
+	parser.add_argument("--silence-threshold", type=float, default=-50, 
+		help="Level in dBFS that counts as speech. Annotations with less than --min-speech of audio above it get '***' without being sent to the ASR engine. A very low value (e.g. -200) sends everything.")
+	parser.add_argument("--min-speech", type=float, default=0.1, 
+		help="Seconds of audio above --silence-threshold an annotation needs to be sent to the ASR engine.")
+	parser.add_argument("--segment", action="store_true", 
+		help="Fill empty tiers from the media: find the stretches of speech (louder than --silence-threshold), create a time-aligned annotation for each & recognize them. Tiers that already have annotations are recognized as usual. Not with --stream.")
+	parser.add_argument("--min-segment", type=float, default=0.5, 
+		help="With --segment, seconds a stretch of speech needs to get an annotation.")
+	parser.add_argument("--max-segment", type=float, default=15, 
+		help="With --segment, longer stretches of speech are cut at their quietest moments into annotations of at most this many seconds (at least 1, & at least twice --min-segment).")
+	parser.add_argument("--min-pause", type=float, default=0.3, 
+		help="With --segment, seconds of silence that separate two annotations; shorter pauses stay within one.")
+	parser.add_argument("--max-length", type=float, default=25, 
+		help="Annotations longer than this many seconds are cut into chunks at pauses, recognized chunk by chunk & stitched back together (the Google API fails on audio of about 30 seconds or more). 0 sends them whole; otherwise at least 1.")
+	parser.add_argument("--pack", type=float, default=0, 
+		help="Pack short annotations together into requests of up to this many seconds & split the results back by word timings (backends with word timings only: whisper, stub). 0 (default) sends every annotation on its own.")
+	parser.add_argument("--pack-gap", type=int, default=300, 
+		help="Milliseconds of silence put between packed annotations.")
+	parser.add_argument("--stub-failure-rate", type=float, default=0.0, 
+		help="Fraction of stub backend requests that fail like an overloaded API (HTTP 429/503), to exercise retries.")
+	parser.add_argument("--rate", type=float, default=0, 
+		help="Maximum ASR requests per second (per process). 0 (default) for no limit.")
+	parser.add_argument("--retries", type=int, default=5, 
+		help="How often to retry a request that failed with a temporary error (rate limited, server error, connection problem), waiting longer each time.")
+	parser.add_argument("-m", "--media-index", type=int, default=0, 
+		help="Select media file to work with. Use only in cases where there are multiple media files associated with the selected elan file. HINT: user `-M` to find media indexes.")
+	parser.add_argument("-M", "--media-indexes", action="store_true", help="Print associated media indexes.")
+	parser.add_argument("-s", "--stream", action="store_true", 
+		help="Read the Elan file incrementally & write results back by patching only the tier's annotation values, keeping memory use low on very large files. The rest of the file is left exactly as it was (no reformatting).")
+	parser.add_argument("-j", "--jobs", type=int, default=1, 
+		help="Number of annotations to slice & send to the ASR API at the same time. Results are still written in document order.")
+	parser.add_argument("-P", "--processes", type=int, default=1, 
+		help="With -E, number of Elan files to work on at the same time (one process each). --jobs is then the limit on ASR requests in flight across all of them.")
+	parser.add_argument("--no-cache", action="store_true", 
+		help=f"Don't look up or store ASR results in the local result cache ({CACHE_PATH}).")
+	parser.add_argument("--cache-size", type=int, default=256, 
+		help="Maximum size of the local result cache in MB. Least recently used results are dropped first.")
+	parser.add_argument("--no-media-cache", action="store_true", 
+		help=f"Don't keep decoded media in the local media cache ({MEDIA_CACHE_DIR}); decode it in memory for every Elan file instead.")
+	parser.add_argument("--media-cache-size", type=int, default=2048, 
+		help="Maximum size of the local media cache in MB (an hour of media takes about 115 MB). Least recently used media are dropped first.")
+	parser.add_argument("--results", type=str, default=None, 
+		help=f"Results store (SQLite) the full ASR response of every recognized annotation is added to: all alternatives, confidence, language & timings, per Elan file & annotation id. Default: {RESULTS_NAME} next to the Elan file or the list of them (-E), one store per corpus.")
+	parser.add_argument("--no-results", action="store_true", 
+		help="Don't keep the full responses in the results store.")
+	parser.add_argument("--low-confidence", type=float, default=None, metavar="THRESHOLD", 
+		help="Print the annotations in the results store whose best transcript has a confidence below THRESHOLD (0-1), per Elan file (only those given with -e / -E, if any), instead of recognizing anything.")
+	parser.add_argument("--alternatives", type=str, default=None, metavar="ANNOTATION_ID", 
+		help="Print all alternative transcripts (with confidence) the results store has for an annotation id (in the Elan files given with -e / -E, if any).")
+	parser.add_argument("--export-json", type=str, default=None, metavar="DIR", 
+		help="Export the results store as one JSON file per annotation: DIR/<Elan file>/<annotation id>.json (only the Elan files given with -e / -E, if any).")
+	parser.add_argument("-i", "--incremental", action="store_true", 
+		help="Only recognize annotations that are empty, still hold a '***' placeholder, or were re-timed since the last --incremental run (unless edited by hand); text edited by hand is never overwritten. What the ASR engine returned is remembered in FILE.asr.json next to the Elan file.")
+	parser.add_argument("-r", "--resume", action="store_true", 
+		help="Pick up an interrupted run: annotations already recognized (and not re-timed) in the previous run are not sent to the ASR API again.")
+	parser.add_argument("--metrics-out", type=str, default=None, 
+		help="Write per-stage timings (p50/p95/p99 per stage, totals per file) & counters (requests, audio bytes sent, cache hits, skipped annotations, ...) to this file: Prometheus text format if it ends in .prom, JSON otherwise.")
+	parser.add_argument("--profile", type=str, default=None, 
+		help="Run under cProfile & write the stats to this file (read them with `python -m pstats FILE`).")
+	parser.add_argument("--serve", action="store_true", 
+		help="Run as a server that keeps the backend (recognizer, HTTP session, model) & result cache loaded & works on jobs sent with --submit, --processes at a time, sharing one budget of --jobs requests in flight.")
+	parser.add_argument("--submit", action="store_true", 
+		help="Send the Elan file(s) to the running --serve server instead of working on them here, & show its progress. Tier, language, media index, --stream, --incremental, --resume, --keep-tmp, --results, the --segment & silence options are sent along; the backend options are the server's.")
+	parser.add_argument("--socket", type=str, default=SOCKET_PATH, 
+		help=f"Unix socket the server listens on (default: {SOCKET_PATH}), or a port number to use local TCP instead.")
+	parser.add_argument("-k", "--keep-tmp", action="store_true", 
+		help="Write the sliced media (.wav) for each annotation to a temporary folder next to the Elan file & keep it, for debugging. The full ASR responses are in the results store (see --results, --export-json).")
+	return parser
+
+
+
+
+def run(argv=None):
+	parser = build_parser()
+	args = parser.parse_args(argv)
+	if args.jobs < 1 or args.processes < 1:
+		parser.error("--jobs & --processes must be at least 1.")
+	if args.sample_rate < 8000:
+		parser.error("--sample-rate must be at least 8000 Hz.")
+	if args.segment and args.stream:
+		parser.error("--segment needs the whole Elan file in memory to add annotations to; leave out --stream.")
+	if args.max_length and args.max_length < 1:
+		parser.error("--max-length must be 0 (no splitting) or at least 1 second.")
+	if args.max_segment < max(1, 2 * args.min_segment):
+		parser.error("--max-segment must be at least 1 second & at least twice --min-segment.")
+	if args.results or args.elan_file or args.list_elan or args.low_confidence is not None or args.alternatives or args.export_json:
+		args.results = results_path(args)
+	if args.language_options is not None:
+		from .languages import print_language_opts
+		print_language_opts(args.language_options)
+	elif args.low_confidence is not None or args.alternatives or args.export_json:
+		query(args)
+	elif args.serve:
+		from .server import serve
+		try:
+			serve(args)
+		except ElanAsrError as e:
+			print(f"\n\t {e}\n")
+			sys.exit(1)
+	elif args.elan_file or args.list_elan:
+		if args.profile:
+			import cProfile
+			profiler = cProfile.Profile()
+			try:
+				profiler.runcall(main, args)
+			finally:
+				profiler.dump_stats(args.profile)
+		else:
+			main(args)
+	else:
+		parser.print_help()
@@ -0,0 +1,260 @@
+"""
+Reading & writing Elan files: time slots, tier annotations, the output formatting & the streaming reader / patcher used with --stream.
+"""
+import os, re
+import xml.etree.ElementTree as et
+from .common import ElanAsrError
+
+
+
+
+def find_media_indexes(elan):
+	media_descriptors = elan.findall("HEADER/MEDIA_DESCRIPTOR")
+	if len(media_descriptors) > 0:
+		print("[INDEX]: [FILE]")
+		print("---------------")
+		for i, md in enumerate(media_descriptors):
+			print(f"[{i}]: {md.get('RELATIVE_MEDIA_URL')[2:]}") 
+
+
+
+
+def index_time_slots(elan, index):
+	for slot in elan.find("TIME_ORDER"):
+		index.add_slot(slot.get("TIME_SLOT_ID"), slot.get("TIME_VALUE"))
+
+
+
+
+def not_alignable(tier_id):
+	return ElanAsrError(f"The tier '{tier_id}' holds reference annotations (no time alignment of their own); only alignable tiers can be recognized.")
+
+
+
+
+def index_tier(tier, index):
+	tier_id = tier.get("TIER_ID")
+	index.add_tier(tier_id)
+	for annotation in tier:
+		for alignable in annotation:
+			if alignable.tag != "ALIGNABLE_ANNOTATION":
+				raise not_alignable(tier_id)
+			index.add_annotation(tier_id, alignable.get("ANNOTATION_ID"), alignable.get("TIME_SLOT_REF1"), alignable.get("TIME_SLOT_REF2"), alignable)
+
+
+
+
+def next_number(ids, prefix):
+	# one past the highest number in the ids made of `prefix` & a number (ts12, a345), so new ids never clash
+	numbers = [int(i[len(prefix):]) for i in ids if i and i.startswith(prefix) and i[len(prefix):].isdigit()]
+	return max(numbers, default=0) + 1
+
+
+
+
+def add_segments(elan, tier, segments, slot_ms):
+	"""
+	Put a new ALIGNABLE_ANNOTATION (empty value) on `tier` for each (start ms, end ms) in `segments`, with a new pair of TIME_SLOTs each. `slot_ms` are the times of the existing slots in document order: if they run in time order, as ELAN writes them, the new slots are merged in keeping it, otherwise they go at the end. Ids continue from the highest in use & the header's lastUsedAnnotationId follows. Returns the new annotation ids.
+	"""
+	time_order = elan.find("TIME_ORDER")
+	slot_number = next_number([slot.get("TIME_SLOT_ID") for slot in time_order], "ts")
+	last_used = elan.find("HEADER/PROPERTY[@NAME='lastUsedAnnotationId']")
+	annotation_ids = [a.get("ANNOTATION_ID") for a in elan.iter() if a.tag in ("ALIGNABLE_ANNOTATION", "REF_ANNOTATION")]
+	if last_used is not None and (last_used.text or "").strip().isdigit():
+		annotation_ids.append(f"a{last_used.text.strip()}")
+	annotation_number = next_number(annotation_ids, "a")
+	new_slots = []
+	ids = []
+	for start, end in segments:
+		refs = []
+		for value in (start, end):
+			new_slots.append((value, et.Element("TIME_SLOT", {"TIME_SLOT_ID": f"ts{slot_number}", "TIME_VALUE": f"{value}"})))
+			refs.append(f"ts{slot_number}")
+			slot_number += 1
+		annotation = et.SubElement(tier, "ANNOTATION")
+		alignable = et.SubElement(annotation, "ALIGNABLE_ANNOTATION", {"ANNOTATION_ID": f"a{annotation_number}", "TIME_SLOT_REF1": refs[0], "TIME_SLOT_REF2": refs[1]})
+		et.SubElement(alignable, "ANNOTATION_VALUE").text = ""
+		ids.append(f"a{annotation_number}")
+		annotation_number += 1
+	slots = list(time_order)
+	if all(a <= b for a, b in zip(slot_ms, slot_ms[1:])):
+		merged = []
+		i = 0
+		for value, slot in new_slots:
+			while i < len(slots) and slot_ms[i] <= value:
+				merged.append(slots[i])
+				i += 1
+			merged.append(slot)
+		slots = merged + slots[i:]
+	else:
+		slots += [slot for value, slot in new_slots]
+	time_order[:] = slots
+	if last_used is not None:
+		last_used.text = f"{annotation_number - 1}"
+	return ids
+
+
+
+
+def pretty(eaf_doc):
+	eaf_doc.text = "\n    "
+	header = eaf_doc.find("HEADER")
+	header.text = "\n        "
+	for i, sh in enumerate(header, start=1):
+		if i != len(header):
+			sh.tail = "\n        "
+		else:
+			sh.tail = "\n    "
+	header.tail = "\n    "
+	time_order = eaf_doc.find("TIME_ORDER")
+	time_order.text = "\n        "
+	nr_of_slots = len(time_order)
+	for slot_idx, slot in enumerate(time_order, start=1):
+		if slot_idx != nr_of_slots:
+			slot.tail = "\n        "
+		else:
+			slot.tail = "\n    "
+	time_order.tail = "\n    "
+	tiers = eaf_doc.findall("TIER")
+	for tier_idx, tier in enumerate(tiers, start=1):
+		tier.tail = "\n    "
+		tier.text = "\n        "
+		nr_of_annotations = len(tier)
+		for annotation_idx, annotation in enumerate(tier, start=1):
+			if annotation_idx != nr_of_annotations:
+				annotation.tail = "\n        "
+			else:
+				annotation.tail = "\n    "
+			annotation.text = "\n            "
+			for alignable in annotation:
+				alignable.text = "\n                "
+				alignable.tail = "\n        "
+				for val in alignable:
+					val.tail = "\n            "
+	ling_types = eaf_doc.findall("LINGUISTIC_TYPE")
+	for ling_type in ling_types:
+		ling_type.tail = "\n    "
+	constraints = eaf_doc.findall("CONSTRAINT")
+	for ci, c in enumerate(constraints, start=1):
+		if ci != len(constraints):
+			c.tail = "\n    "
+		else:
+			c.tail = "\n"
+	return eaf_doc				   
+
+
+
+
+def stream_read_eaf(eaf, index, tier_ids=None):
+	"""
+	Read what a run needs from an Elan file without building the whole tree: media URLs, the time slots & the annotations of the tiers in `tier_ids` (the first tier if None), which go into `index` (an AnnotationIndex, alignables None; tiers that don't exist are left out). Every element is dropped from its parent once it has been read, so memory stays flat however big the other tiers are. Returns (media_urls, {annotation id: current value}).
+	"""
+	media_urls = []
+	values = {}
+	tier_id = None
+	annotation_id = None
+	stack = []
+	for event, elem in et.iterparse(eaf, events=("start", "end")):
+		if event == "start":
+			stack.append(elem)
+			if elem.tag == "TIER" and (elem.get("TIER_ID") in tier_ids if tier_ids else not index.building):
+				tier_id = elem.get("TIER_ID")
+				index.add_tier(tier_id)
+			elif elem.tag == "ALIGNABLE_ANNOTATION":
+				annotation_id = elem.get("ANNOTATION_ID")
+			continue
+		stack.pop()
+		if elem.tag == "MEDIA_DESCRIPTOR":
+			media_urls.append(elem.get("MEDIA_URL"))
+		elif elem.tag == "TIME_SLOT":
+			index.add_slot(elem.get("TIME_SLOT_ID"), elem.get("TIME_VALUE"))
+		elif elem.tag == "ANNOTATION_VALUE" and tier_id is not None:
+			values[annotation_id] = elem.text or ""
+		elif elem.tag == "ALIGNABLE_ANNOTATION" and tier_id is not None:
+			index.add_annotation(tier_id, elem.get("ANNOTATION_ID"), elem.get("TIME_SLOT_REF1"), elem.get("TIME_SLOT_REF2"))
+		elif elem.tag == "REF_ANNOTATION" and tier_id is not None:
+			raise not_alignable(tier_id)
+		elif elem.tag == "TIER":
+			tier_id = None
+		if stack:
+			stack[-1].remove(elem)
+	return media_urls, values
+
+
+
+
+def escape(text):
+	# as xml.sax.saxutils' (which drags in urllib.request, slowing down -M)
+	return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+
+
+def unescape(text):
+	return text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&apos;", "'").replace("&amp;", "&")
+
+
+
+
+def xml_attr(tag, name):
+	match = re.search(rf"""\s{name}\s*=\s*(["'])(.*?)\1""", tag, re.S)
+	if match:
+		return unescape(match.group(2))
+	return None
+
+
+
+
+def stream_patch_eaf(eaf, tier_ids, transcriptions, chunk_size=1 << 16):
+	"""
+	Rewrite an Elan file by streaming it through & replacing only the ANNOTATION_VALUE text of annotations in `transcriptions` ({annotation id: text}) on the tiers in `tier_ids`. Everything else, formatting & line endings included, is copied through as is.
+	"""
+	out_path = f"{eaf}.part"
+	in_tier = False
+	annotation_id = None
+	replacing = False
+	with open(eaf, 'r', encoding="utf-8", newline="") as inf, open(out_path, 'w', encoding="utf-8", newline="") as outf:
+		buf = ""
+		while True:
+			chunk = inf.read(chunk_size)
+			buf += chunk
+			out = []
+			pos = 0
+			while True:
+				lt = buf.find("<", pos)
+				gt = buf.find(">", lt) if lt >= 0 else -1
+				if gt < 0:
+					break
+				if not replacing:
+					out.append(buf[pos:lt])
+				tag = buf[lt:gt + 1]
+				pos = gt + 1
+				name = re.match(r"</?([\w.:-]*)", tag).group(1)
+				if name == "TIER":
+					in_tier = not tag.startswith("</") and xml_attr(tag, "TIER_ID") in tier_ids
+				elif name == "ALIGNABLE_ANNOTATION" and not tag.startswith("</"):
+					annotation_id = xml_attr(tag, "ANNOTATION_ID")
+				elif name == "ANNOTATION_VALUE" and in_tier and annotation_id in transcriptions:
+					if tag.startswith("</"):
+						replacing = False
+					elif tag.endswith("/>"):
+						tag = f"<ANNOTATION_VALUE>{escape(transcriptions[annotation_id])}</ANNOTATION_VALUE>"
+					else:
+						tag = f"{tag}{escape(transcriptions[annotation_id])}"
+						replacing = True
+				out.append(tag)
+			rest = buf[pos:]
+			if not chunk:
+				if not replacing:
+					out.append(rest)
+				outf.write("".join(out))
+				break
+			# keep an unfinished tag for the next chunk, text before it can go out now
+			lt = rest.find("<")
+			if lt < 0:
+				lt = len(rest)
+			if not replacing:
+				out.append(rest[:lt])
+			buf = rest[lt:]
+			outf.write("".join(out))
+	os.replace(out_path, eaf)
@@ -0,0 +1,98 @@
+"""
+The time line of an Elan file as arrays: time slots resolved to milliseconds & each tier's annotations as start / end arrays, for slicing & for queries over whole tiers at once.
+"""
+import numpy as np
+from .common import ElanAsrError
+
+
+
+
+def resolve_time_slots(values):
+	# TIME_VALUEs in document (= time) order, None for unaligned slots -> int64 ms; an unaligned slot is placed by interpolating between its aligned neighbours
+	ms = np.array(["nan" if value is None else value for value in values], dtype=object).astype(np.float64)
+	aligned = ~np.isnan(ms)
+	if not aligned.any():
+		return np.zeros(len(ms), dtype=np.int64)
+	if not aligned.all():
+		positions = np.arange(len(ms))
+		ms[~aligned] = np.interp(positions[~aligned], positions[aligned], ms[aligned])
+	return np.rint(ms).astype(np.int64)
+
+
+
+
+class AnnotationIndex:
+	"""
+	Time slots & tier annotations of one Elan file, filled in one pass by the readers in eaf.py (add_slot, add_tier, add_annotation) & then finish()ed: time slots become milliseconds & each tier keeps its annotations sorted by start time as arrays of ids, start & end times (ms), with the alignable elements (None when streamed) alongside. Queries (window, total_speech, overlaps) work on whole tiers at once.
+	"""
+	def __init__(self):
+		self.slot_positions = {}
+		self.slot_values = []
+		self.building = {}
+		self.tiers = {}
+		self.ms = None
+
+	def add_slot(self, slot_id, value):
+		self.slot_positions[slot_id] = len(self.slot_values)
+		self.slot_values.append(value)
+
+	def add_tier(self, tier_id):
+		self.building.setdefault(tier_id, ([], [], [], []))
+
+	def add_annotation(self, tier_id, annotation_id, ref1, ref2, alignable=None):
+		ids, refs1, refs2, alignables = self.building.setdefault(tier_id, ([], [], [], []))
+		for ref in (ref1, ref2):
+			if ref not in self.slot_positions:
+				raise ElanAsrError(f"Annotation {annotation_id} on tier '{tier_id}' refers to a time slot ({ref}) that isn't in the TIME_ORDER. Fix the Elan file & try again.")
+		ids.append(annotation_id)
+		refs1.append(self.slot_positions[ref1])
+		refs2.append(self.slot_positions[ref2])
+		alignables.append(alignable)
+
+	def finish(self):
+		self.ms = resolve_time_slots(self.slot_values)
+		for tier_id, (ids, refs1, refs2, alignables) in self.building.items():
+			starts = self.ms[np.array(refs1, dtype=np.int64)]
+			ends = self.ms[np.array(refs2, dtype=np.int64)]
+			order = np.lexsort((ends, starts))
+			starts, ends = starts[order], ends[order]
+			# reach[i]: the latest end of annotations 0..i, so searches stay valid when annotations overlap
+			reach = np.maximum.accumulate(ends) if len(ends) else ends
+			self.tiers[tier_id] = (np.array(ids, dtype=object)[order], starts, ends, reach, [alignables[i] for i in order])
+		self.building = {}
+		return self
+
+	def __contains__(self, tier_id):
+		return tier_id in self.tiers
+
+	def annotations(self, tier_id):
+		# [(alignable, annotation id, start ms, end ms)] in time order
+		ids, starts, ends, reach, alignables = self.tiers[tier_id]
+		return list(zip(alignables, ids.tolist(), starts.tolist(), ends.tolist()))
+
+	def window(self, tier_id, start, end):
+		# ids of the annotations overlapping [start, end) ms
+		ids, starts, ends, reach, alignables = self.tiers[tier_id]
+		candidates = np.arange(np.searchsorted(reach, start, side="right"), np.searchsorted(starts, end, side="left"))
+		return ids[candidates[ends[candidates] > start]]
+
+	def total_speech(self, tier_id):
+		# ms covered by the tier's annotations, overlapping stretches counted once
+		ids, starts, ends, reach, alignables = self.tiers[tier_id]
+		if not len(starts):
+			return 0
+		first = np.flatnonzero(np.r_[True, starts[1:] > reach[:-1]])
+		last = np.r_[first[1:], len(starts)] - 1
+		return int(np.sum(reach[last] - starts[first]))
+
+	def overlaps(self, tier_a, tier_b):
+		# (ids on tier_a, ids on tier_b, ms of overlap) for every pair of annotations that overlap
+		a_ids, a_starts, a_ends, a_reach, a_alignables = self.tiers[tier_a]
+		b_ids, b_starts, b_ends, b_reach, b_alignables = self.tiers[tier_b]
+		lo = np.searchsorted(b_reach, a_starts, side="right")
+		counts = np.maximum(np.searchsorted(b_starts, a_ends, side="left") - lo, 0)
+		a_pos = np.repeat(np.arange(len(a_starts)), counts)
+		b_pos = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - lo, counts)
+		overlap = np.minimum(a_ends[a_pos], b_ends[b_pos]) - np.maximum(a_starts[a_pos], b_starts[b_pos])
+		keep = overlap > 0
+		return a_ids[a_pos[keep]], b_ids[b_pos[keep]], overlap[keep]
@@ -0,0 +1,47 @@
+"""
+The table of language options for -L, read from languages.tsv only when it's asked for.
+"""
+import os, re
+
+
+LANGUAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages.tsv")
+
+
+
+
+def load_languages(path=LANGUAGES_PATH):
+	# (header, rows); rows keep their original line for printing, cells are stripped for matching
+	with open(path, 'r', encoding="utf-8") as inf:
+		lines = [line.rstrip("\n") for line in inf if line.strip()]
+	header = [cell.strip() for cell in lines[0].split("\t")]
+	rows = [(line, [cell.strip() for cell in line.split("\t")]) for line in lines[1:]]
+	return lines[0], header, rows
+
+
+
+
+def matcher(header, rows, term):
+	# a language code, whole or up to a subtag (de, de-, de-AT), matches the BCP-47 column; a feature column named by the term, as a whole word or from its start, needs a ✔ there; anything else is looked for in name, code & model
+	term = term.lower()
+	def is_code(cells):
+		code = cells[1].lower()
+		return code == term or code.startswith(term if term.endswith("-") else f"{term}-")
+	if any(is_code(cells) for line, cells in rows):
+		return is_code
+	features = [i for i, name in enumerate(header[3:], start=3) if name.lower().startswith(term) or re.search(rf"\b{re.escape(term)}\b", name.lower())]
+	if features:
+		return lambda cells: any(i < len(cells) and cells[i] for i in features)
+	return lambda cells: term in " ".join(cells[:3]).lower()
+
+
+
+
+def print_language_opts(filters=()):
+	print("Language options for the Google Speech-to-Text API (as of 2023-04-16). If you use another API, the opts may be different.")
+	header_line, header, rows = load_languages()
+	matchers = [matcher(header, rows, term) for term in filters]
+	rows = [line for line, cells in rows if all(match(cells) for match in matchers)]
+	if not rows:
+		print(f"\nNo language options match {' & '.join(repr(term) for term in filters)}.\n")
+		return
+	print("\n" + "\n".join([header_line] + rows) + "\n")
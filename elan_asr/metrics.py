@@ -0,0 +1,108 @@
+"""
+Per-stage timings & counters, & writing them out for --metrics-out.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+import contextvars, json, threading, time
+
+
+
+
+class Metrics:
+	"""
+	Per-call timings of each pipeline stage & event counters (requests, audio bytes sent, cache hits, ...) for the Elan file being processed. Thread-safe; `reset` starts a new file & `report` summarizes it with latency percentiles per stage.
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.reset()
+
+	def reset(self):
+		with self.lock:
+			self.timings = defaultdict(list)
+			self.counters = defaultdict(int)
+			self.started = time.perf_counter()
+
+	@contextmanager
+	def time(self, stage):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add(stage, time.perf_counter() - start)
+
+	def add(self, stage, seconds):
+		with self.lock:
+			self.timings[stage].append(seconds)
+
+	def count(self, name, n=1):
+		with self.lock:
+			self.counters[name] += n
+
+	def report(self, eaf):
+		import numpy as np # only here, so the --submit client can write metrics without loading numpy
+		with self.lock:
+			stages = {}
+			for stage, times in self.timings.items():
+				p50, p95, p99 = np.percentile(times, [50, 95, 99])
+				stages[stage] = {"calls": len(times), "total_seconds": sum(times), "p50": p50, "p95": p95, "p99": p99, "max": max(times)}
+			return {"file": eaf, "wall_seconds": time.perf_counter() - self.started, "stages": stages, "counters": dict(self.counters)}
+
+
+
+
+# the Metrics of the job being worked on, for a backend shared by several jobs at once (--serve); run_pipeline carries it into its threads
+current_job = contextvars.ContextVar("current_job", default=None)
+
+
+
+
+class JobMetrics(Metrics):
+	"""
+	Metrics for a backend that --serve shares between jobs: timings & counts (requests, retries, audio sent, ...) go to the Metrics of the job they were made for (current_job), so each job's report has its own.
+	"""
+	def add(self, stage, seconds):
+		job = current_job.get()
+		if job is None:
+			return super().add(stage, seconds)
+		job.add(stage, seconds)
+
+	def count(self, name, n=1):
+		job = current_job.get()
+		if job is None:
+			return super().count(name, n)
+		job.count(name, n)
+
+
+
+
+def prometheus_label(value):
+	return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+
+
+def write_metrics(path, reports):
+	# Prometheus text exposition format for *.prom, JSON otherwise
+	if not path.endswith(".prom"):
+		with open(path, 'w', encoding="utf-8") as outj:
+			json.dump({"files": reports}, outj, indent=4, ensure_ascii=False)
+		return
+	lines = [
+		"# HELP elan_asr_stage_seconds Time per call of each pipeline stage.",
+		"# TYPE elan_asr_stage_seconds summary",
+	]
+	for report in reports:
+		f = prometheus_label(report["file"])
+		for stage, t in report["stages"].items():
+			labels = f'file="{f}",stage="{stage}"'
+			for quantile in ("p50", "p95", "p99"):
+				lines.append(f'elan_asr_stage_seconds{{{labels},quantile="0.{quantile[1:]}"}} {t[quantile]:.6f}')
+			lines.append(f"elan_asr_stage_seconds_sum{{{labels}}} {t['total_seconds']:.6f}")
+			lines.append(f"elan_asr_stage_seconds_count{{{labels}}} {t['calls']}")
+	lines += ["# HELP elan_asr_file_seconds Wall time per Elan file.", "# TYPE elan_asr_file_seconds gauge"]
+	lines += [f'elan_asr_file_seconds{{file="{prometheus_label(r["file"])}"}} {r["wall_seconds"]:.6f}' for r in reports]
+	for name in sorted(set(name for r in reports for name in r["counters"])):
+		lines += [f"# TYPE elan_asr_{name}_total counter"]
+		lines += [f'elan_asr_{name}_total{{file="{prometheus_label(r["file"])}"}} {r["counters"][name]}' for r in reports if name in r["counters"]]
+	with open(path, 'w', encoding="utf-8") as outp:
+		outp.write("\n".join(lines) + "\n")
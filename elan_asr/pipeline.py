@@ -0,0 +1,311 @@
+"""
+Working through one Elan file: recognize its annotations concurrently & write the results back.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+import contextvars, os, shutil, threading
+import speech_recognition as sr
+import xml.etree.ElementTree as et
+from .audio import decode_media, has_speech, slice_media, speech_segments
+from .common import ElanAsrError, RESULTS_NAME, SAMPLE_RATE
+from .eaf import add_segments, index_tier, index_time_slots, pretty, stream_patch_eaf, stream_read_eaf
+from .index import AnnotationIndex
+from .metrics import Metrics
+from .store import Fingerprints, Journal, MediaCache, ResultsStore
+
+
+
+
+def run_pipeline(items, work, jobs=1, progress=None):
+	# yields (item, work(item)) in the original order, calling progress(item) as each one finishes; with jobs > 1 at most `jobs` calls run at once
+	# & at most 2 * jobs items are queued, so a slow item holds back the queue instead of growing it
+	if jobs <= 1:
+		for item in items:
+			result = work(item)
+			if progress:
+				progress(item)
+			yield item, result
+		return
+	with ThreadPoolExecutor(max_workers=jobs) as pool:
+		pending = deque()
+		for item in items:
+			future = pool.submit(contextvars.copy_context().run, work, item) # with the caller's current_job (metrics.py)
+			if progress:
+				future.add_done_callback(lambda f, item=item: progress(item))
+			pending.append((item, future))
+			if len(pending) >= 2 * jobs:
+				head, head_future = pending.popleft()
+				yield head, head_future.result()
+		while pending:
+			head, head_future = pending.popleft()
+			yield head, head_future.result()
+
+
+
+
+def srecognize(segments, lang, backend, cache=None, sample_rate=SAMPLE_RATE, metrics=None):
+	# (transcriptions, full responses); a response is None where recognition failed
+	sr_responses = [None] * len(segments)
+	keys = [None] * len(segments)
+	if cache:
+		for i, segment in enumerate(segments):
+			keys[i] = cache.key(segment, lang, backend.name, backend.model, sample_rate)
+			sr_responses[i] = cache.get(keys[i])
+		if metrics:
+			hits = sum(sr_response is not None for sr_response in sr_responses)
+			metrics.count("cache_hits", hits)
+			metrics.count("cache_misses", len(segments) - hits)
+	todo = [i for i, sr_response in enumerate(sr_responses) if sr_response is None]
+	bad_resp = '***'
+	if todo:
+		try:
+			for i, sr_response in zip(todo, backend.recognize([segments[i] for i in todo], lang, sample_rate)):
+				sr_responses[i] = sr_response
+				if cache:
+					cache.put(keys[i], sr_response)
+		except sr.UnknownValueError:
+			bad_resp = "***U"
+		except sr.RequestError:
+			bad_resp = None # retries ran out; leave the annotation as it is so a --resume run can try again
+	transcriptions = []
+	for sr_response in sr_responses:
+		if sr_response:
+			transcription = sr_response['alternative'][0]['transcript']
+		elif sr_response is None:
+			transcription = bad_resp
+		else:
+			transcription = '***'
+		transcriptions.append(transcription)
+	return transcriptions, sr_responses
+
+
+
+
+def index_elan(elan, tiers):
+	# AnnotationIndex of an Elan tree's time slots & the given TIER elements
+	index = AnnotationIndex()
+	index_time_slots(elan, index)
+	for tier in tiers:
+		if tier.get("TIER_ID") not in index.building:
+			index_tier(tier, index)
+	return index.finish()
+
+
+
+
+def process_eaf(eaf, args, backend, cache=None, metrics=None, verbose=True, progress=None):
+	say = print if verbose else (lambda *a, **k: None)
+	metrics = metrics or Metrics()
+	metrics.reset()
+	say("\t...getting time stamps...")
+	specs = args.tier or [(None, None, None)]
+	index = AnnotationIndex()
+	with metrics.time("parse"):
+		if args.stream:
+			media_urls, values = stream_read_eaf(eaf, index, [tier_id for tier_id, media_index, language in specs if tier_id])
+			index.finish()
+			tiers = {tier_id: index.annotations(tier_id) for tier_id in index.tiers}
+		else:
+			e_parsed = et.parse(eaf)
+			elan = e_parsed.getroot()
+			media_urls = [md.get("MEDIA_URL") for md in elan.findall("HEADER/MEDIA_DESCRIPTOR")]
+			index = index_elan(elan, [tier for tier in [elan.find(f"TIER[@TIER_ID='{tier_id}']") if tier_id else elan.find("TIER") for tier_id, media_index, language in specs] if tier is not None])
+			tiers = {tier_id: index.annotations(tier_id) for tier_id in index.tiers}
+			values = {annotation[1]: annotation[0].findtext("ANNOTATION_VALUE") or "" for annotations in tiers.values() for annotation in annotations}
+	# one job per tier: (tier id, media index, language, annotations)
+	jobs = {}
+	for tier_id, media_index, language in specs:
+		tier_id = tier_id or next(iter(tiers), None)
+		if tier_id not in tiers:
+			raise ElanAsrError(f"The tier '{tier_id}' was not found. Tier names are case sensitive; Try again.")
+		jobs[tier_id] = (tier_id, args.media_index if media_index is None else media_index, language or args.language, tiers[tier_id])
+	jobs = list(jobs.values())
+	medias = {}
+	for tier_id, media_index, language, annotations in jobs:
+		try:
+			medias[media_index] = media_urls[media_index][7:]
+		except IndexError:
+			raise ElanAsrError("There was a problem getting the media_descriptor. Probably you passed an index that doesn't exist (indexes start at --0--!); Try again.")
+		if not os.path.exists(medias[media_index]):
+			raise ElanAsrError("The media file was not found or doesn't exist. Fix that & try again.")
+	elan_path = os.path.dirname(os.path.abspath(eaf))
+	tmp_dir = f"{elan_path}/tmp/{os.path.basename(eaf)[:-4]}"
+	if not os.path.exists(tmp_dir):
+		say("\t...writing temporary dir...")
+		os.makedirs(tmp_dir, exist_ok=True)
+
+	# each media file is decoded once, however many tiers use it, & with the media cache once for all Elan files & runs that use it
+	media_cache = None if args.no_media_cache else MediaCache(max_bytes=args.media_cache_size * 1024 ** 2)
+	pcms = {}
+	for media_index, media in medias.items():
+		say("\t...decoding media..." if len(medias) == 1 else f"\t...decoding media {media_index}...")
+		with metrics.time("decode"):
+			pcms[media_index] = media_cache.load(media, args.sample_rate) if media_cache else decode_media(media, args.sample_rate)
+		if pcms[media_index] is None:
+			raise ElanAsrError("ffmpeg could not decode the media file. Fix that & try again.")
+
+	# --segment: an empty tier gets an annotation for each stretch of speech in its media, recognized like any other
+	created = 0
+	if args.segment:
+		for i, (tier_id, media_index, language, annotations) in enumerate(jobs):
+			tier = elan.find(f"TIER[@TIER_ID='{tier_id}']")
+			if annotations:
+				say(f"\t...tier '{tier_id}' already has annotations, not segmenting it")
+				continue
+			if tier.get("PARENT_REF"):
+				raise ElanAsrError(f"The tier '{tier_id}' depends on the tier '{tier.get('PARENT_REF')}'; --segment can only fill independent tiers.")
+			say(f"\t...segmenting media for tier '{tier_id}'...")
+			with metrics.time("segment"):
+				segments = speech_segments(pcms[media_index], args.silence_threshold, args.min_segment, args.max_segment, args.min_pause, sample_rate=args.sample_rate)
+				values.update((annotation_id, "") for annotation_id in add_segments(elan, tier, segments, index.ms.tolist()))
+				index = index_elan(elan, [elan.find(f"TIER[@TIER_ID='{job[0]}']") for job in jobs])
+			jobs[i] = (tier_id, media_index, language, index.annotations(tier_id))
+			created += len(segments)
+			say(f"\t...{len(segments)} annotations created, {index.total_speech(tier_id) / 1000:.1f} s of speech")
+
+	unchanged = 0
+	if args.incremental:
+		fingerprints = Fingerprints(f"{eaf[:-4]}.asr.json")
+		for i, (tier_id, media_index, language, annotations) in enumerate(jobs):
+			todo = [a for a in annotations if fingerprints.needs_asr(a[1], a[2], a[3], values[a[1]])]
+			unchanged += len(annotations) - len(todo)
+			jobs[i] = (tier_id, media_index, language, todo)
+		say(f"\t...incremental: {unchanged} annotations unchanged or edited by hand, {sum(len(job[3]) for job in jobs)} to recognize...")
+
+	say("\t...iterating over tier..." if len(jobs) == 1 else f"\t...iterating over {len(jobs)} tiers...")
+	if verbose:
+		backend.reset_counters() # only for the stats lines at the end; with --serve jobs share the backend, so reports count through metrics instead
+	transcriptions = {}
+	journal = Journal(f"{tmp_dir}/journal.jsonl", args.resume)
+	results = None if args.no_results else ResultsStore(args.results or os.path.join(elan_path, RESULTS_NAME))
+	# all tiers' annotations go through one queue; a batch stays within a tier, so it has one media & language
+	batches = [(job, job[3][i:i + backend.batch_size]) for job in jobs for i in range(0, len(job[3]), backend.batch_size)]
+	total = sum(len(annotations) for tier_id, media_index, language, annotations in jobs)
+
+	silent = []
+	silent_lock = threading.Lock()
+
+	def work(item):
+		(tier_id, media_index, language, annotations), batch = item
+		pcm = pcms[media_index]
+		txs = [journal.lookup(annotation_id, start_time, end_time) for alignable, annotation_id, start_time, end_time in batch]
+		todo = [i for i, tx in enumerate(txs) if tx is None]
+		with metrics.time("slice"):
+			segments = [slice_media(pcm, batch[i][1], batch[i][2], batch[i][3], tmp_dir, args.keep_tmp, args.sample_rate) for i in todo]
+		if todo:
+			# no speech, no request: the placeholder the API would have given us anyway
+			with metrics.time("silence_check"):
+				speech = [has_speech(segment, args.silence_threshold, args.min_speech, args.sample_rate) for segment in segments]
+			for i, segment, voiced in zip(todo, segments, speech):
+				if not voiced:
+					alignable, annotation_id, start_time, end_time = batch[i]
+					journal.record(annotation_id, start_time, end_time, '***')
+					txs[i] = '***'
+			with silent_lock:
+				silent.extend(batch[i][1] for i, voiced in zip(todo, speech) if not voiced)
+			segments = [segment for segment, voiced in zip(segments, speech) if voiced]
+			todo = [i for i, voiced in zip(todo, speech) if voiced]
+		if todo:
+			with metrics.time("recognize"):
+				new_txs, responses = srecognize(segments, language, backend, cache, args.sample_rate, metrics)
+			for i, tx, response in zip(todo, new_txs, responses):
+				alignable, annotation_id, start_time, end_time = batch[i]
+				if tx is not None:
+					journal.record(annotation_id, start_time, end_time, tx)
+				if results and response is not None:
+					results.add(eaf, tier_id, annotation_id, start_time, end_time, language, backend.name, backend.model, response)
+				txs[i] = tx
+		return txs
+
+	if journal.done:
+		say(f"\t...resuming, {len(journal.done)} annotations already done...")
+	stopped = f"The run stopped before {eaf} was written. Finished annotations are saved in {journal.path}; rerun with --resume to skip them."
+	failed = 0
+
+	done = 0
+	done_lock = threading.Lock()
+
+	def batch_done(item):
+		# called on the pool's threads as batches finish; the lock keeps the count & the progress sent to --submit in step
+		nonlocal done
+		with done_lock:
+			done += len(item[1])
+			pbar.set_postfix(backend.status(), refresh=False)
+			pbar.update(len(item[1]))
+			if progress:
+				progress(done, total)
+
+	try:
+		with tqdm(total=total, disable=not verbose) as pbar:
+			for (job, batch), txs in run_pipeline(batches, work, args.jobs, batch_done):
+				for (alignable, annotation_id, start_time, end_time), tx in zip(batch, txs):
+					if tx is None:
+						failed += 1
+						if verbose:
+							tqdm.write(f"--> Annotation [{annotation_id}]: request failed, left as it was")
+						continue
+					if verbose:
+						tqdm.write(f"--> Annotation [{annotation_id}]: {tx}")
+					transcriptions[annotation_id] = tx
+					if args.incremental:
+						fingerprints.update(annotation_id, start_time, end_time, tx)
+					if alignable is not None:
+						for val in alignable:
+							val.text = tx
+	except KeyboardInterrupt:
+		journal.close()
+		if results:
+			results.close()
+		print(f"\n\t {stopped}\n")
+		raise
+	except Exception as e:
+		journal.close()
+		if results:
+			results.close()
+		raise ElanAsrError(f"{e!r}. {stopped}") from e
+	journal.close()
+	if results:
+		results.close()
+		say(f"\t...full responses stored in {results.path}")
+	pcms.clear()
+	if cache:
+		cache.flush() # the hits' last use, in one transaction per file
+		say(f"\t...cache: {metrics.counters['cache_hits']} hits, {metrics.counters['cache_misses']} misses")
+	if silent:
+		say(f"\t...{len(silent)} annotations without speech were given '***' without a request")
+	for line in backend.stats():
+		say(f"\t...{line}")
+	if failed:
+		say(f"\t...{failed} annotations could not be recognized & were left as they were; rerun with --resume to retry just those")
+	with metrics.time("write"):
+		if args.incremental and not transcriptions:
+			say("\t...nothing changed, Elan file left as it was")
+		elif args.stream:
+			stream_patch_eaf(eaf, [job[0] for job in jobs], transcriptions)
+		else:
+			elan = pretty(elan)
+			tree = et.ElementTree(elan)
+			tree.write(eaf, encoding="utf-8", xml_declaration=True)
+	if args.incremental:
+		fingerprints.save()
+	metrics.count("tiers", len(jobs))
+	metrics.count("annotations", total)
+	metrics.count("segments_created", created)
+	metrics.count("annotated_ms", sum(index.total_speech(job[0]) for job in jobs))
+	metrics.count("resumed", len(journal.done))
+	metrics.count("unchanged", unchanged)
+	metrics.count("silent_skipped", len(silent))
+	metrics.count("failed", failed)
+	if media_cache:
+		metrics.count("media_cache_hits", media_cache.hits)
+		metrics.count("media_cache_misses", media_cache.misses)
+
+	if not args.keep_tmp and not failed: # with failures, the journal is kept for --resume
+		say("\t...removing temporary files")
+		shutil.rmtree(tmp_dir)
+		try:
+			os.rmdir(f"{elan_path}/tmp")
+		except OSError:
+			pass # still holds other files' temporary dirs
+	return metrics.report(eaf)
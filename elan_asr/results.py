@@ -0,0 +1,67 @@
+"""
+Looking things up in the results store from the command line: low-confidence annotations, alternative transcripts & the per-annotation JSON export.
+"""
+import json, os
+from .common import ElanAsrError
+from .store import ResultsStore
+
+
+
+
+def open_results(path):
+	if not os.path.exists(path):
+		raise ElanAsrError(f"No results store at {path}. Recognize something first, or point --results at one.")
+	return ResultsStore(path)
+
+
+
+
+def timespan(start_time, end_time):
+	return f"{start_time / 1000:.3f}-{end_time / 1000:.3f}s"
+
+
+
+
+def print_low_confidence(path, threshold, files=None):
+	results = open_results(path)
+	rows = results.low_confidence(threshold, files)
+	results.close()
+	current = None
+	for file, tier_id, annotation_id, start_time, end_time, confidence, transcript in rows:
+		if file != current:
+			print(f"\n{file}")
+			current = file
+		print(f"\t{annotation_id}\t[{tier_id}]\t{timespan(start_time, end_time)}\t{confidence:.2f}\t{transcript}")
+	print(f"\n{len(rows)} annotations with a confidence below {threshold} in {len(set(row[0] for row in rows))} Elan files.")
+
+
+
+
+def print_alternatives(path, annotation_id, files=None):
+	results = open_results(path)
+	rows = results.responses(annotation_id, files)
+	results.close()
+	if not rows:
+		print(f"No results for annotation {annotation_id}.")
+	for file, tier_id, annotation_id, start_time, end_time, response in rows:
+		print(f"\n{file} [{tier_id}] {annotation_id} {timespan(start_time, end_time)}")
+		for i, alternative in enumerate(response["alternative"] if response else [], start=1):
+			confidence = f" ({alternative['confidence']:.2f})" if "confidence" in alternative else ""
+			print(f"\t{i}. {alternative['transcript']}{confidence}")
+		if not response:
+			print("\tnothing recognized")
+
+
+
+
+def export_json(path, out_dir, files=None):
+	# the old --keep-tmp layout: OUT_DIR/<Elan file name>/<annotation id>.json, one full response each
+	results = open_results(path)
+	rows = results.responses(files=files)
+	results.close()
+	for file, tier_id, annotation_id, start_time, end_time, response in rows:
+		file_dir = os.path.join(out_dir, os.path.basename(file)[:-4])
+		os.makedirs(file_dir, exist_ok=True)
+		with open(os.path.join(file_dir, f"{annotation_id}.json"), 'w', encoding="utf-8") as outj:
+			json.dump(response, outj, indent=4, ensure_ascii=False)
+	print(f"Exported {len(rows)} responses to {out_dir}")
@@ -0,0 +1,147 @@
+"""
+The --serve daemon & the --submit client that talks to it.
+"""
+import argparse, json, os, queue, signal, socket, socketserver, threading
+from .common import ElanAsrError, finished_message
+
+
+
+
+# what a client can set per job; everything else (backend, model, --jobs, ...) is fixed when the server starts
+JOB_OPTIONS = ("tier", "language", "media_index", "stream", "incremental", "resume", "keep_tmp", "results", "no_results", "segment", "min_segment", "max_segment", "min_pause", "silence_threshold", "min_speech")
+
+
+
+
+def server_address(spec):
+	# a port number means local TCP (for systems without Unix sockets), anything else is a socket path
+	return ("127.0.0.1", int(spec)) if spec.isdigit() else spec
+
+
+
+
+class JobServer:
+	"""
+	The --serve daemon: one backend (recognizer, HTTP session, model), result cache & budget of --jobs requests in flight, kept warm for every job. Clients send one JSON line {"files": [...], "options": {...}} & get one JSON line per event back (progress, finished, failed) until all their files are done. Jobs are queued & worked on --processes at a time.
+	"""
+	def __init__(self, args):
+		from .backends import make_backend
+		from .metrics import JobMetrics
+		from .store import ResultCache
+		self.args = args
+		self.backend = make_backend(args, metrics=JobMetrics())
+		self.cache = None if args.no_cache else ResultCache(max_bytes=args.cache_size * 1024 ** 2)
+		self.jobs = queue.Queue()
+		for i in range(max(1, args.processes)):
+			threading.Thread(target=self.work, daemon=True).start()
+
+	def work(self):
+		from .metrics import Metrics, current_job
+		from .pipeline import process_eaf
+		while True:
+			eaf, options, events = self.jobs.get()
+			args = argparse.Namespace(**{**vars(self.args), **options})
+			progress = lambda done, total: events.put({"event": "progress", "file": eaf, "done": done, "total": total})
+			metrics = Metrics()
+			token = current_job.set(metrics) # what the shared backend counts for this job goes into its report
+			try:
+				report = process_eaf(eaf, args, self.backend, self.cache, metrics, verbose=False, progress=progress)
+			except Exception as e:
+				events.put({"event": "failed", "file": eaf, "error": str(e) if isinstance(e, ElanAsrError) else repr(e)})
+			else:
+				events.put({"event": "finished", "file": eaf, "report": report})
+			finally:
+				current_job.reset(token)
+			self.jobs.task_done()
+
+	def handle(self, rfile, wfile):
+		line = rfile.readline()
+		if not line:
+			return # a connection that only checks whether the server is up
+		request = json.loads(line)
+		options = {name: value for name, value in request.get("options", {}).items() if name in JOB_OPTIONS}
+		events = queue.Queue()
+		for eaf in request["files"]:
+			self.jobs.put((eaf, options, events))
+		remaining = len(request["files"])
+		while remaining:
+			event = events.get()
+			if event["event"] != "progress":
+				remaining -= 1
+			try:
+				wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+				wfile.flush()
+			except OSError:
+				pass # the client went away; its jobs still finish
+
+
+
+
+def serve(args):
+	address = server_address(args.socket)
+	if isinstance(address, str) and os.path.exists(address):
+		try:
+			with socket.socket(socket.AF_UNIX) as probe:
+				probe.connect(address)
+			raise ElanAsrError(f"A server is already listening on {address}.")
+		except ConnectionRefusedError:
+			os.remove(address) # left behind by a server that was killed
+	job_server = JobServer(args)
+
+	class Handler(socketserver.StreamRequestHandler):
+		def handle(self):
+			job_server.handle(self.rfile, self.wfile)
+
+	server_class = socketserver.ThreadingUnixStreamServer if isinstance(address, str) else socketserver.ThreadingTCPServer
+	server_class.daemon_threads = True
+	signal.signal(signal.SIGTERM, signal.default_int_handler) # stop cleanly on kill as on Ctrl-C
+	with server_class(address, Handler) as server:
+		print(f"Serving on {args.socket} with the {job_server.backend.name} backend; Ctrl-C to stop.")
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			if job_server.cache:
+				job_server.cache.close()
+			if isinstance(address, str):
+				os.remove(address)
+
+
+
+
+def submit(eafs, args):
+	"""
+	Thin client for --serve: hand the files to the running server & show its progress. Returns (failed, reports) like run_batch.
+	"""
+	address = server_address(args.socket)
+	request = {"files": [os.path.abspath(eaf) for eaf in eafs], "options": {name: getattr(args, name) for name in JOB_OPTIONS}}
+	failed = []
+	reports = []
+	bars = {}
+	try:
+		conn = socket.create_connection(address) if isinstance(address, tuple) else socket.socket(socket.AF_UNIX)
+		if isinstance(address, str):
+			conn.connect(address)
+	except OSError as e:
+		raise ElanAsrError(f"Could not reach a server on {args.socket} ({e}); start one with --serve.")
+	from tqdm import tqdm
+	with conn, conn.makefile('rb') as events:
+		conn.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+		for line in events:
+			event = json.loads(line)
+			eaf = event["file"]
+			if event["event"] == "progress":
+				if eaf not in bars:
+					bars[eaf] = tqdm(total=event["total"], desc=os.path.basename(eaf), position=len(bars), leave=False)
+				bars[eaf].update(event["done"] - bars[eaf].n)
+				continue
+			if eaf in bars:
+				bars.pop(eaf).close()
+			if event["event"] == "failed":
+				failed.append(eaf)
+				tqdm.write(f"Failed ~~| {eaf} |~~ {event['error']}")
+			else:
+				reports.append(event["report"])
+				tqdm.write(finished_message(eaf, event["report"]))
+	return failed, reports
@@ -0,0 +1,291 @@
+"""
+What is kept on disk between runs: the result cache, the decoded media cache, the results store, the --resume journal & the --incremental fingerprints.
+"""
+import hashlib, json, os, sqlite3, subprocess, threading, time
+import numpy as np
+from .audio import pcm_command
+from .common import CACHE_PATH, MEDIA_CACHE_DIR, SAMPLE_RATE
+
+
+
+
+class ResultCache:
+	"""
+	Persistent store of full ASR responses keyed by a hash of the sliced audio plus everything else that changes the response (language, backend, model). Least recently used entries are evicted once the stored responses exceed `max_bytes`; hits are written back in batches of `touch_batch` (or on put, flush & close) rather than one commit each.
+	"""
+	def __init__(self, path=CACHE_PATH, max_bytes=256 * 1024 ** 2, touch_batch=256):
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		self.lock = threading.Lock()
+		self.db = sqlite3.connect(path, check_same_thread=False)
+		self.db.execute("PRAGMA journal_mode=WAL")
+		self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+		self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+		self.db.commit()
+		self.max_bytes = max_bytes
+		self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+		self.touched = {}
+		self.touch_batch = touch_batch
+
+	def key(self, segment, lang, backend, model=None, sample_rate=SAMPLE_RATE):
+		h = hashlib.sha256(segment)
+		h.update(f"\0{sample_rate}\0{lang}\0{backend}\0{model}".encode("utf-8"))
+		return h.hexdigest()
+
+	def get(self, key):
+		with self.lock:
+			row = self.db.execute("SELECT response FROM results WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return None
+			# last use kept in memory, written in one transaction with the others
+			self.touched[key] = time.time()
+			if len(self.touched) >= self.touch_batch:
+				self.write_touched()
+				self.db.commit()
+		return json.loads(row[0])
+
+	def write_touched(self):
+		if self.touched:
+			self.db.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(last_used, key) for key, last_used in self.touched.items()])
+			self.touched = {}
+
+	def flush(self):
+		with self.lock:
+			self.write_touched()
+			self.db.commit()
+
+	def put(self, key, response):
+		value = json.dumps(response, ensure_ascii=False)
+		with self.lock:
+			old = self.db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+			if old:
+				self.size -= old[0]
+			self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, value, len(value), time.time()))
+			self.size += len(value)
+			self.write_touched() # so eviction sees what was used lately
+			self.evict()
+			self.db.commit()
+
+	def evict(self):
+		while self.size > self.max_bytes:
+			rows = self.db.execute("SELECT key, size FROM results ORDER BY last_used LIMIT 64").fetchall()
+			if not rows:
+				break
+			for key, size in rows:
+				if self.size <= self.max_bytes:
+					break
+				self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+				self.size -= size
+
+	def close(self):
+		self.flush()
+		self.db.close()
+
+
+
+
+class MediaCache:
+	"""
+	Directory of decoded media: the recognizer-ready mono PCM of each media file, as a raw file that is memory mapped instead of read, so Elan files that share a recording (and later runs) don't decode it again & several processes share one copy in the page cache. Keyed by the media's path, modification time & size, so a changed file is decoded afresh. Least recently used files are deleted once the directory holds more than `max_bytes`.
+	"""
+	def __init__(self, path=MEDIA_CACHE_DIR, max_bytes=2048 * 1024 ** 2):
+		os.makedirs(path, exist_ok=True)
+		self.path = path
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+
+	def key(self, media, sample_rate=SAMPLE_RATE):
+		media = os.path.realpath(media)
+		stat = os.stat(media)
+		return hashlib.sha256(f"{media}\0{stat.st_mtime_ns}\0{stat.st_size}\0{sample_rate}".encode("utf-8")).hexdigest()
+
+	def load(self, media, sample_rate=SAMPLE_RATE):
+		# the decoded media as a read-only array backed by the cache file; None if ffmpeg can't decode it
+		path = os.path.join(self.path, f"{self.key(media, sample_rate)}.s16le")
+		if os.path.exists(path):
+			self.hits += 1
+			os.utime(path) # the file's mtime is its last use, for eviction
+		else:
+			self.misses += 1
+			part = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+			proc = subprocess.run(pcm_command(media, part, sample_rate), stdout=subprocess.DEVNULL)
+			if proc.returncode != 0:
+				if os.path.exists(part):
+					os.remove(part)
+				return None
+			os.replace(part, path)
+			self.evict(keep=path)
+		if os.path.getsize(path) == 0:
+			return np.zeros(0, dtype="<i2") # a zero length file can't be mapped
+		return np.memmap(path, dtype="<i2", mode="r")
+
+	def evict(self, keep=None):
+		files = []
+		for entry in os.scandir(self.path):
+			if entry.name.endswith(".s16le"):
+				stat = entry.stat()
+				files.append((stat.st_mtime, stat.st_size, entry.path))
+		size = sum(file_size for mtime, file_size, path in files)
+		for mtime, file_size, path in sorted(files):
+			if size <= self.max_bytes:
+				break
+			if path == keep:
+				continue
+			try:
+				os.remove(path) # a process still mapping it keeps its copy until it's done
+			except OSError:
+				continue
+			size -= file_size
+
+
+
+
+class ResultsStore:
+	"""
+	One SQLite file per corpus with the full ASR response of every recognized annotation (all alternatives, confidence, language, word timings), keyed by Elan file & annotation id, alongside the tier, time span, language, backend & top transcript & confidence for querying; recognizing an annotation again replaces its row. Rows are buffered & written `batch_size` at a time in one transaction, so many small annotations cost neither a commit nor a file each. Several processes (-P) can write to the same store.
+	"""
+	def __init__(self, path, batch_size=500):
+		self.path = path
+		self.batch_size = batch_size
+		self.lock = threading.Lock()
+		self.pending = []
+		self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+		self.db.execute("PRAGMA journal_mode=WAL")
+		self.db.execute("""CREATE TABLE IF NOT EXISTS results (
+			file TEXT NOT NULL, tier TEXT, annotation_id TEXT NOT NULL, start_ms INTEGER, end_ms INTEGER,
+			language TEXT, backend TEXT, model TEXT, transcript TEXT, confidence REAL, response TEXT NOT NULL, recognized REAL NOT NULL,
+			PRIMARY KEY (file, annotation_id))""")
+		self.db.execute("CREATE INDEX IF NOT EXISTS results_confidence ON results (file, confidence)")
+		self.db.execute("CREATE INDEX IF NOT EXISTS results_annotation ON results (annotation_id)")
+		self.db.commit()
+
+	def add(self, eaf, tier_id, annotation_id, start_time, end_time, language, backend, model, response):
+		best = response["alternative"][0] if response else {}
+		row = (os.path.abspath(eaf), tier_id, annotation_id, start_time, end_time, language, backend, model, best.get("transcript"), best.get("confidence"), json.dumps(response, ensure_ascii=False), time.time())
+		with self.lock:
+			self.pending.append(row)
+			if len(self.pending) >= self.batch_size:
+				self.write()
+
+	def write(self):
+		self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self.pending)
+		self.db.commit()
+		self.pending = []
+
+	def flush(self):
+		with self.lock:
+			if self.pending:
+				self.write()
+
+	def close(self):
+		self.flush()
+		self.db.close()
+
+	def files_clause(self, files):
+		# (" AND file IN (...)", paths) to narrow a query down to some Elan files, or ("", ()) for all of them
+		if not files:
+			return "", ()
+		paths = tuple(os.path.abspath(eaf) for eaf in files)
+		return f" AND file IN ({', '.join('?' * len(paths))})", paths
+
+	def low_confidence(self, threshold, files=None):
+		# [(file, tier, annotation id, start ms, end ms, confidence, transcript)] below `threshold`, by file & time
+		clause, params = self.files_clause(files)
+		return self.db.execute(f"SELECT file, tier, annotation_id, start_ms, end_ms, confidence, transcript FROM results WHERE confidence < ?{clause} ORDER BY file, start_ms", (threshold,) + params).fetchall()
+
+	def responses(self, annotation_id=None, files=None):
+		# [(file, tier, annotation id, start ms, end ms, full response)], for one annotation id or all of them
+		clause, params = self.files_clause(files)
+		if annotation_id is not None:
+			clause += " AND annotation_id = ?"
+			params += (annotation_id,)
+		rows = self.db.execute(f"SELECT file, tier, annotation_id, start_ms, end_ms, response FROM results WHERE 1{clause} ORDER BY file, start_ms", params)
+		return [row[:5] + (json.loads(row[5]),) for row in rows]
+
+
+
+
+class Journal:
+	"""
+	Append-only record of finished annotations (id, time span & transcription), written as results come in so an interrupted run can be picked up again with --resume. Writes are flushed at most every `flush_interval` seconds (by a timer when no more come), so a killed run loses at most that much work & a run on a network file system doesn't pay a round trip per annotation.
+	"""
+	def __init__(self, path, resume=False, flush_interval=1.0):
+		self.path = path
+		self.flush_interval = flush_interval
+		self.flushed = time.monotonic()
+		self.timer = None
+		self.lock = threading.Lock()
+		self.done = {}
+		if resume and os.path.exists(path):
+			with open(path, 'r', encoding="utf-8") as inj:
+				for line in inj:
+					try:
+						entry = json.loads(line)
+					except json.JSONDecodeError:
+						continue # a line cut short when the previous run was killed
+					self.done[entry["id"]] = entry
+		self.outj = open(path, 'a' if resume else 'w', encoding="utf-8")
+
+	def lookup(self, annotation_id, start_time, end_time):
+		entry = self.done.get(annotation_id)
+		if entry and entry["start"] == start_time and entry["end"] == end_time:
+			return entry["text"]
+		return None
+
+	def record(self, annotation_id, start_time, end_time, transcription):
+		line = json.dumps({"id": annotation_id, "start": start_time, "end": end_time, "text": transcription}, ensure_ascii=False)
+		with self.lock:
+			self.outj.write(line + "\n")
+			wait = self.flush_interval - (time.monotonic() - self.flushed)
+			if wait <= 0:
+				self.flush_locked()
+			elif self.timer is None:
+				# nothing may come after this line for a long while; make sure it's on disk within flush_interval anyway
+				self.timer = threading.Timer(wait, self.flush)
+				self.timer.daemon = True
+				self.timer.start()
+
+	def flush_locked(self):
+		if self.timer is not None:
+			self.timer.cancel()
+			self.timer = None
+		if not self.outj.closed:
+			self.outj.flush()
+		self.flushed = time.monotonic()
+
+	def flush(self):
+		with self.lock:
+			self.flush_locked()
+
+	def close(self):
+		with self.lock:
+			self.flush_locked()
+			self.outj.close()
+
+
+
+
+class Fingerprints:
+	"""
+	Sidecar file (next to the Elan file) remembering, per annotation, the time span it was recognized with & what the ASR engine returned, for --incremental. An annotation needs recognizing if it's empty or still holds a '***' placeholder, or if it was re-timed since & its text is still the ASR output; text that differs from the last ASR output was edited by hand & is left alone.
+	"""
+	def __init__(self, path):
+		self.path = path
+		self.entries = {}
+		if os.path.exists(path):
+			with open(path, 'r', encoding="utf-8") as inj:
+				self.entries = json.load(inj)
+
+	def needs_asr(self, annotation_id, start_time, end_time, text):
+		if not text or text.startswith("***"):
+			return True
+		entry = self.entries.get(annotation_id)
+		return entry is not None and text == entry["asr"] and (entry["start"], entry["end"]) != (start_time, end_time)
+
+	def update(self, annotation_id, start_time, end_time, transcription):
+		self.entries[annotation_id] = {"start": start_time, "end": end_time, "asr": transcription}
+
+	def save(self):
+		with open(f"{self.path}.part", 'w', encoding="utf-8") as outj:
+			json.dump(self.entries, outj, ensure_ascii=False, indent=1)
+		os.replace(f"{self.path}.part", self.path)